@@ -0,0 +1 @@
+"""Benchmarks for Tion breezer integration running against simulated breezers"""
@@ -0,0 +1,351 @@
+"""In-process replacement for tion_btle breezer drivers"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import json
+import random
+import time
+from types import SimpleNamespace
+from dataclasses import dataclass, field
+
+from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
+from tion_btle.tion import MaxTriesExceededError, TionDelegation
+
+MODELS = ("S3", "S4", "Lite")
+
+FAULT_TIMEOUT = "timeout"
+FAULT_DISCONNECT = "disconnect"
+FAULT_STALE_DEVICE = "stale_device"
+FAULT_SLOW_CONNECT = "slow_connect"
+FAULT_PARTIAL_WRITE = "partial_write"
+FAULT_MAX_TRIES = "max_tries"
+
+# operations that may be affected by every fault
+FAULT_OPERATIONS: dict[str, tuple[str, ...]] = {
+    FAULT_TIMEOUT: ("connect", "get", "set"),
+    FAULT_DISCONNECT: ("get", "set"),
+    FAULT_STALE_DEVICE: ("connect",),
+    FAULT_SLOW_CONNECT: ("connect",),
+    FAULT_PARTIAL_WRITE: ("set",),
+    FAULT_MAX_TRIES: ("connect",),
+}
+
+
+class FaultInjector:
+    """Decides which fault (if any) should happen with next operation of a fake breezer.
+
+    Faults may be scheduled for n-th call of operation or happen randomly with given probability.
+    """
+
+    def __init__(self, probabilities: dict[str, float] | None = None, seed: int | None = None):
+        self.probabilities: dict[str, float] = probabilities or {}
+        self._scheduled: dict[str, dict[int, str]] = collections.defaultdict(dict)
+        self._calls: collections.Counter = collections.Counter()
+        self._random = random.Random(seed)
+        self.injected: collections.Counter = collections.Counter()
+
+    def schedule(self, operation: str, call: int, fault: str) -> None:
+        """Inject fault into call-th (counting from 1) future call of operation"""
+        self._scheduled[operation][self._calls[operation] + call] = fault
+
+    def draw(self, operation: str) -> str | None:
+        self._calls[operation] += 1
+        fault = self._scheduled[operation].pop(self._calls[operation], None)
+        if fault is None:
+            for candidate, probability in self.probabilities.items():
+                if operation in FAULT_OPERATIONS[candidate] and self._random.random() < probability:
+                    fault = candidate
+                    break
+
+        if fault is not None:
+            self.injected[fault] += 1
+        return fault
+
+
+@dataclass
+class Latency:
+    """Simulated duration (seconds) of driver operations: mean and +- jitter share"""
+    connect: float = 0.5
+    get: float = 0.3
+    set: float = 0.4
+    disconnect: float = 0.05
+    jitter: float = 0.2
+
+    def delay(self, operation: str) -> float:
+        mean = getattr(self, operation)
+        return max(mean * random.uniform(1 - self.jitter, 1 + self.jitter), 0.0)
+
+
+@dataclass
+class Airtime:
+    """Counters of simulated radio usage"""
+    connects: int = 0
+    gets: int = 0
+    sets: int = 0
+    seconds: float = 0.0
+    # spent by operations that failed and by operations done while breezer was failing
+    retry_seconds: float = 0.0
+
+
+class FakeTion:
+    """Simulated breezer with tion_btle.tion.Tion interface used by the integration.
+
+    Connections are counted like in tion_btle: get() and set() connect and disconnect by themselves, but don't close
+    connection opened by outer connect().
+    """
+
+    def __init__(self, mac: str, model: str, latency: Latency | None = None, source: str = "hci0",
+                 faults: FaultInjector | None = None, timeout: float = 10.0, slow_factor: float = 10.0):
+        self.mac: str = mac
+        self.model: str = model
+        self.source: str = source
+        self.latency: Latency = latency if latency is not None else Latency()
+        self.airtime = Airtime()
+        self._connections: int = 0
+        self._connected: bool = False
+        self.btle_device: BLEDevice | str = mac
+        self.faults: FaultInjector | None = faults
+        # seconds before timeout fault is raised and multiplier of connect time for slow connects
+        self.timeout: float = timeout
+        self.slow_factor: float = slow_factor
+        # breezer is out of range: no advertisements, connections fail
+        self.hidden: bool = False
+        # BLEDevice handle became invalid, connections fail until new one is received with advertisement
+        self.stale: bool = False
+        # scanners or proxies that hear breezer (RSSI for every one) and ones that fail to connect
+        self.sources: dict[str, int] = {source: -60}
+        self.degraded_sources: set[str] = set()
+        # like Home Assistant's bleak wrapper in tion_btle: reports scanner of established connection
+        self._btle = SimpleNamespace(_connected_scanner=None)
+        # notifications are passed to handler like in tion_btle, integration may replace it
+        self._delegation = TionDelegation()
+        self._data: bytearray = bytearray()
+        self.have_breezer_state: bool = False
+        # seconds between first failure and next successful operation
+        self.recoveries: list[float] = []
+        self._failing_since: float | None = None
+        self.state: dict = {
+            "state": "on",
+            "heater": "off",
+            "sound": "off",
+            "mode": "outside",
+            "out_temp": 20,
+            "in_temp": 5,
+            "heater_temp": 20,
+            "fan_speed": 2,
+            "filter_remain": 180.0,
+            "request_error_code": 0,
+            "model": model,
+        }
+        if model == "S3":
+            self.state["fw_version"] = "0034"
+
+    async def _wait(self, delay: float):
+        self.airtime.seconds += delay
+        if self._failing_since is not None:
+            self.airtime.retry_seconds += delay
+        await asyncio.sleep(delay)
+
+    def _failed(self):
+        if self._failing_since is None:
+            self._failing_since = time.monotonic()
+
+    def _succeeded(self):
+        if self._failing_since is not None:
+            self.recoveries.append(time.monotonic() - self._failing_since)
+            self._failing_since = None
+
+    def _drop_connection(self):
+        self._connected = False
+
+    async def _spend(self, operation: str, settings: dict | None = None):
+        """Simulate radio operation, failing it if fault is injected"""
+        fault = self.faults.draw(operation) if self.faults is not None else None
+        delay = self.latency.delay(operation)
+
+        if operation == "connect" and (self.hidden or self.stale or fault == FAULT_STALE_DEVICE):
+            self.stale = self.stale or fault == FAULT_STALE_DEVICE
+            self._failed()
+            await self._wait(delay)
+            raise BleakError("Device with address %s was not found" % self.mac)
+
+        if operation == "connect" and self.via in self.degraded_sources:
+            self._failed()
+            await self._wait(self.timeout)
+            raise BleakError("Could not connect via %s" % self.via)
+
+        if fault == FAULT_SLOW_CONNECT:
+            delay *= self.slow_factor
+        elif fault == FAULT_TIMEOUT:
+            self._failed()
+            await self._wait(self.timeout)
+            raise asyncio.TimeoutError()
+        elif fault == FAULT_MAX_TRIES:
+            # driver tried to connect several times before giving up
+            self._failed()
+            await self._wait(delay * 3)
+            raise MaxTriesExceededError()
+        elif fault in (FAULT_DISCONNECT, FAULT_PARTIAL_WRITE):
+            self._failed()
+            await self._wait(delay / 2)
+            if fault == FAULT_PARTIAL_WRITE and settings:
+                self._apply(dict(list(settings.items())[:len(settings) // 2 or 1]))
+            self._drop_connection()
+            raise BleakError("Disconnected")
+
+        await self._wait(delay)
+        if settings is not None:
+            self._apply(settings)
+
+    @property
+    def via(self) -> str:
+        """Source that is used for connection: like Home Assistant, the one with the best RSSI"""
+        return max(self.sources, key=self.sources.get)
+
+    @property
+    def connection_status(self) -> str:
+        return "connected" if self._connected else "disc"
+
+    async def connect(self):
+        if self._connections > 0 and not self._connected:
+            # connection was lost: tion_btle doesn't reconnect while connection is counted
+            raise BleakError("Not connected")
+        if self._connections <= 0:
+            self._connections = 0
+            if not self._connected:
+                self.airtime.connects += 1
+                await self._spend("connect")
+                self._connected = True
+                self._btle._connected_scanner = SimpleNamespace(source=self.via)
+        self._connections += 1
+
+    async def disconnect(self):
+        self._connections -= 1
+        if self._connections <= 0 and self._connected:
+            await self._spend("disconnect")
+            self._connected = False
+
+    def _drift(self):
+        """Environment changes between polls"""
+        self.state["in_temp"] += random.choice((-1, 0, 0, 0, 1))
+        if self.state["heater"] == "on":
+            self.state["out_temp"] = self.state["heater_temp"]
+        else:
+            self.state["out_temp"] = self.state["in_temp"] + random.choice((0, 1))
+        self.state["filter_remain"] = max(self.state["filter_remain"] - 0.001, 0)
+
+    async def get(self, skip_update: bool = False) -> dict:
+        try:
+            await self.connect()
+            if not skip_update:
+                self.airtime.gets += 1
+                await self._spend("get")
+                self._drift()
+        finally:
+            await self.disconnect()
+
+        self._succeeded()
+        heating = "on" if self.state["heater"] == "on" and self.state["heater_temp"] - self.state["in_temp"] > 3 \
+            else "off"
+        return {**self.state, "heating": heating}
+
+    async def set(self, new_settings: dict | None = None):
+        new_settings = dict(new_settings or {})
+        if new_settings.get("fan_speed") == 0:
+            del new_settings["fan_speed"]
+            new_settings["state"] = "off"
+
+        try:
+            await self.connect()
+            self.airtime.sets += 1
+            await self._spend("set", new_settings)
+        finally:
+            await self.disconnect()
+
+        self._succeeded()
+
+    def remote(self, **settings):
+        """Change state like physical remote does: breezer reports new state to connected client"""
+        self._apply(settings)
+        if self._connected:
+            self._delegation.handleNotification(0, bytearray(json.dumps(self.state).encode()))
+
+    def _collect_message(self, package: bytearray) -> bool:
+        self._data = package
+        return True
+
+    def _decode_response(self, response: bytearray):
+        self.state.update(json.loads(response))
+
+    def _apply(self, settings: dict):
+        for k in ("fan_speed", "heater_temp", "heater", "sound", "mode", "state"):
+            if k in settings:
+                self.state[k] = settings[k]
+
+    async def pair(self):
+        await self.connect()
+        try:
+            await self._spend("set")
+        finally:
+            await self.disconnect()
+
+    def update_btle_device(self, new_device: str | BLEDevice):
+        if new_device is not None:
+            self.btle_device = new_device
+            self.stale = False
+
+
+@dataclass
+class FakeFleet:
+    """Set of simulated breezers. Models are cycled through S3, S4 and Lite."""
+    size: int
+    latency: Latency = field(default_factory=Latency)
+    adapters: int = 1
+    faults: dict[str, float] = field(default_factory=dict)
+    seed: int | None = None
+    devices: dict[str, FakeTion] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for i in range(self.size):
+            mac = "AA:BB:CC:00:%02X:%02X" % (i // 256, i % 256)
+            self.devices[mac] = FakeTion(
+                mac=mac,
+                model=MODELS[i % len(MODELS)],
+                latency=self.latency,
+                source="hci%d" % (i % self.adapters),
+                faults=FaultInjector(self.faults, seed=None if self.seed is None else self.seed + i),
+            )
+
+    def ble_device(self, mac: str, source: str | None = None) -> BLEDevice | None:
+        if mac not in self.devices or self.devices[mac].hidden:
+            return None
+        device = self.devices[mac]
+        source = source if source is not None else device.source
+        return BLEDevice(mac, "Tion Breezer %s" % device.model, {"source": source},
+                         rssi=device.sources.get(source, -60))
+
+    def scanner_devices(self, mac: str) -> list[SimpleNamespace]:
+        """Like bluetooth.async_scanner_devices_by_address: every scanner or proxy that hears breezer"""
+        if mac not in self.devices or self.devices[mac].hidden:
+            return []
+        return [
+            SimpleNamespace(
+                scanner=SimpleNamespace(source=source, name=source),
+                ble_device=self.ble_device(mac, source),
+                advertisement=SimpleNamespace(rssi=rssi),
+            )
+            for source, rssi in self.devices[mac].sources.items()
+        ]
+
+    @property
+    def airtime(self) -> Airtime:
+        total = Airtime()
+        for device in self.devices.values():
+            total.connects += device.airtime.connects
+            total.gets += device.airtime.gets
+            total.sets += device.airtime.sets
+            total.seconds += device.airtime.seconds
+            total.retry_seconds += device.airtime.retry_seconds
+        return total
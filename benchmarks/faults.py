@@ -0,0 +1,298 @@
+"""Fault injection scenarios for Tion integration: simulated breezers fail, integration should recover.
+
+Everything runs offline against fake breezers. Usage (from repository root, with Home Assistant installed):
+
+    python -m benchmarks.faults --scenario random --devices 5 --duration 120 --fault timeout=0.05 --fault disconnect=0.05
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from homeassistant.helpers import entity_registry as er
+
+import custom_components.ha_tion_btle as integration
+from custom_components.ha_tion_btle.const import DOMAIN
+
+from .fake_tion import FAULT_DISCONNECT, FAULT_OPERATIONS, FakeFleet, Latency
+from .harness import Bench, async_bench
+from .run import entity_ids, percentiles
+
+SCENARIOS = ("random", "preset_disconnect", "vanish_before_refresh", "write_connect_failure")
+
+COMMAND_OK = "ok"
+COMMAND_TIMEOUT = "timeout"
+
+
+def device_report(bench: Bench) -> list[dict]:
+    report = []
+    for instance in bench.instances:
+        device = bench.fleet.devices[instance.unique_id]
+        report.append({
+            "mac": instance.unique_id,
+            "model": device.model,
+            "injected": dict(device.faults.injected),
+            "recoveries": percentiles(device.recoveries),
+            "airtime_seconds": device.airtime.seconds,
+            "retry_airtime_seconds": device.airtime.retry_seconds,
+            "breaker": instance.breaker.as_dict,
+            "failures": instance.metrics.failures,
+            "retries": instance.metrics.retries,
+            "success_rate": instance.metrics.success_rate,
+        })
+    return report
+
+
+@contextlib.asynccontextmanager
+async def async_advertising(bench: Bench, interval: float):
+    """Send advertisements of visible breezers periodically, like bluetooth stack does"""
+    async def advertise():
+        while True:
+            for mac in bench.fleet.devices:
+                bench.advertise(mac)
+            await asyncio.sleep(interval)
+
+    task = asyncio.get_running_loop().create_task(advertise())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+
+async def async_command(bench: Bench, domain: str, service: str, data: dict, timeout: float) -> str:
+    """Call service and wait for it; result is COMMAND_OK, COMMAND_TIMEOUT (call didn't finish in time) or name of
+    exception"""
+    deadline = asyncio.timeout(timeout)
+    try:
+        async with deadline:
+            await bench.hass.services.async_call(domain, service, data, blocking=True)
+    except Exception as e:
+        # timeout of breezer is error of command, not stuck command
+        return COMMAND_TIMEOUT if deadline.expired() else type(e).__name__
+    return COMMAND_OK
+
+
+async def async_add_fleet(bench: Bench, args: argparse.Namespace):
+    options = {
+        "keep_alive": args.keep_alive,
+        "min_keep_alive": max(args.keep_alive // 2, 1),
+        "max_keep_alive": args.keep_alive * 4,
+    }
+    for mac in bench.fleet.devices:
+        await bench.async_add_entry(mac, options)
+
+
+async def async_random(bench: Bench, args: argparse.Namespace) -> dict:
+    """Random faults while breezers are polled and controlled"""
+    latencies: list[float] = []
+    errors: int = 0
+    timeouts: int = 0
+
+    async def commands():
+        nonlocal errors, timeouts
+        climates = entity_ids(bench, "climate")
+        while True:
+            await asyncio.sleep(args.command_interval)
+            started = time.perf_counter()
+            result = await async_command(bench, "climate", "set_fan_mode", {
+                "entity_id": random.choice(climates), "fan_mode": str(random.randint(1, 6))}, args.command_timeout)
+            if result == COMMAND_OK:
+                latencies.append(time.perf_counter() - started)
+            elif result == COMMAND_TIMEOUT:
+                timeouts += 1
+            else:
+                errors += 1
+
+    await async_add_fleet(bench, args)
+    async with async_advertising(bench, args.advertisement_interval):
+        task = asyncio.get_running_loop().create_task(commands())
+        await asyncio.sleep(args.duration)
+        task.cancel()
+
+    return {"command_latency": percentiles(latencies), "command_errors": errors, "command_timeouts": timeouts}
+
+
+async def async_preset_disconnect(bench: Bench, args: argparse.Namespace) -> dict:
+    """Connection is lost while climate changes preset: how long until shown state matches breezer"""
+    await async_add_fleet(bench, args)
+    results = []
+    async with async_advertising(bench, args.advertisement_interval):
+        await asyncio.sleep(args.keep_alive)
+        for instance in bench.instances:
+            device = bench.fleet.devices[instance.unique_id]
+            climate = er.async_get(bench.hass).async_get_entity_id("climate", DOMAIN, instance.unique_id)
+            device.faults.schedule("set", 1, FAULT_DISCONNECT)
+
+            started = time.perf_counter()
+            error = None
+            try:
+                await bench.hass.services.async_call("climate", "set_preset_mode", {
+                    "entity_id": climate, "preset_mode": "boost"}, blocking=True)
+            except Exception as e:
+                error = type(e).__name__
+
+            while instance.data.get("fan_speed") != device.state["fan_speed"] and \
+                    time.perf_counter() - started < args.duration:
+                await asyncio.sleep(0.1)
+            results.append({
+                "mac": instance.unique_id,
+                "error": error,
+                "consistent_after_seconds": time.perf_counter() - started,
+            })
+    return {"presets": results}
+
+
+async def async_vanish_before_refresh(bench: Bench, args: argparse.Namespace) -> dict:
+    """Breezers disappear right after setup found them and come back later"""
+    for device in bench.fleet.devices.values():
+        # found by setup, but connection will fail until breezer advertises again
+        device.stale = True
+    await async_add_fleet(bench, args)
+    for device in bench.fleet.devices.values():
+        device.hidden = True
+
+    await asyncio.sleep(args.reappear_after)
+    reappeared = time.perf_counter()
+    for device in bench.fleet.devices.values():
+        device.hidden = False
+
+    first_state = {}
+    async with async_advertising(bench, args.advertisement_interval):
+        while len(first_state) < len(bench.instances) and time.perf_counter() - reappeared < args.duration:
+            for instance in bench.instances:
+                if instance.unique_id not in first_state and instance.last_update_success and instance.data:
+                    first_state[instance.unique_id] = time.perf_counter() - reappeared
+            await asyncio.sleep(0.1)
+
+    return {"first_state_after_reappearance": percentiles(list(first_state.values())),
+            "never_recovered": len(bench.instances) - len(first_state)}
+
+
+async def async_write_connect_failure(bench: Bench, args: argparse.Namespace) -> dict:
+    """Connection fails while change is written (every kind of connect fault in turn): caller gets error, next change
+    is written anyway"""
+    # every write connects, polls don't interfere
+    options = {"keep_alive": 3600, "min_keep_alive": 3600, "max_keep_alive": 3600, "idle_timeout": 0}
+    for mac in bench.fleet.devices:
+        await bench.async_add_entry(mac, options)
+
+    started = time.perf_counter()
+    while not all(i.data for i in bench.instances) and time.perf_counter() - started < args.duration:
+        await asyncio.sleep(0.1)
+    # connections of first polls are closed
+    await asyncio.sleep(1)
+
+    results = []
+    connect_faults = [f for f, operations in FAULT_OPERATIONS.items() if "connect" in operations]
+    for instance in bench.instances:
+        device = bench.fleet.devices[instance.unique_id]
+        climate = er.async_get(bench.hass).async_get_entity_id("climate", DOMAIN, instance.unique_id)
+        for fault_name in connect_faults:
+            # speeds that differ from current one, so both changes are written
+            first_speed = device.state["fan_speed"] % 6 + 1
+            next_speed = first_speed % 6 + 1
+
+            device.faults.schedule("connect", 1, fault_name)
+            faulty = await async_command(bench, "climate", "set_fan_mode",
+                                         {"entity_id": climate, "fan_mode": str(first_speed)}, args.command_timeout)
+            # breezer is heard again
+            bench.advertise(instance.unique_id)
+            written = await async_command(bench, "climate", "set_fan_mode",
+                                          {"entity_id": climate, "fan_mode": str(next_speed)}, args.command_timeout)
+            results.append({
+                "mac": instance.unique_id,
+                "fault": fault_name,
+                "faulty_write": faulty,
+                "next_write": written,
+                "fan_speed_written": device.state["fan_speed"] == next_speed,
+            })
+    stuck = sum(1 for r in results if COMMAND_TIMEOUT in (r["faulty_write"], r["next_write"]))
+    return {"writes": results, "stuck": stuck}
+
+
+async def async_main(args: argparse.Namespace) -> dict:
+    fleet = FakeFleet(
+        args.devices,
+        Latency(args.connect, args.get, args.set),
+        adapters=args.adapters,
+        faults=dict(args.fault),
+        seed=args.seed,
+    )
+    for device in fleet.devices.values():
+        device.timeout = args.timeout
+
+    scenario = {
+        "random": async_random,
+        "preset_disconnect": async_preset_disconnect,
+        "vanish_before_refresh": async_vanish_before_refresh,
+        "write_connect_failure": async_write_connect_failure,
+    }[args.scenario]
+
+    with patch.object(integration, "BREAKER_BASE_DELAY", args.breaker_base_delay):
+        async with async_bench(fleet) as bench:
+            started = time.perf_counter()
+            result = await scenario(bench, args)
+            result["seconds"] = time.perf_counter() - started
+            result["devices"] = device_report(bench)
+            airtime = fleet.airtime
+            result["airtime"] = {"seconds": airtime.seconds, "retry_seconds": airtime.retry_seconds,
+                                 "connects": airtime.connects, "gets": airtime.gets, "sets": airtime.sets}
+
+    return {
+        "scenario": args.scenario,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+        "result": result,
+    }
+
+
+def fault(value: str) -> tuple[str, float]:
+    name, _, probability = value.partition("=")
+    if name not in FAULT_OPERATIONS:
+        raise argparse.ArgumentTypeError("unknown fault %s, expected one of %s" % (name, ", ".join(FAULT_OPERATIONS)))
+    return name, float(probability or 0.1)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS, default="random")
+    parser.add_argument("--devices", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run scenario (or wait for recovery)")
+    parser.add_argument("--fault", type=fault, action="append", default=[],
+                        help="fault=probability, for example timeout=0.05. May be repeated")
+    parser.add_argument("--seed", type=int, default=None, help="seed for random faults")
+    parser.add_argument("--adapters", type=int, default=1)
+    parser.add_argument("--keep-alive", type=int, default=5, help="poll interval of breezers (seconds)")
+    parser.add_argument("--command-interval", type=float, default=2, help="seconds between commands")
+    parser.add_argument("--command-timeout", type=float, default=30,
+                        help="seconds to wait for command before it is counted as stuck")
+    parser.add_argument("--advertisement-interval", type=float, default=1)
+    parser.add_argument("--reappear-after", type=float, default=15,
+                        help="seconds while breezers are gone in vanish_before_refresh scenario")
+    parser.add_argument("--breaker-base-delay", type=float, default=integration.BREAKER_BASE_DELAY,
+                        help="first backoff delay (seconds)")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds before timeout fault is raised")
+    parser.add_argument("--connect", type=float, default=0.5, help="simulated connect time")
+    parser.add_argument("--get", type=float, default=0.3, help="simulated state request time")
+    parser.add_argument("--set", type=float, default=0.4, help="simulated state change time")
+    parser.add_argument("--output", default="fault_results.json", help="file for results (JSON)")
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR, force=True)
+    args = parse_args()
+    report = asyncio.run(async_main(args))
+    Path(args.output).write_text(json.dumps(report, indent=2, default=str))
+    print(json.dumps(report["result"], indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Home Assistant instance with Tion integration connected to simulated breezers"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from homeassistant import bootstrap, config_entries, loader
+from homeassistant.components import bluetooth
+from homeassistant.core import CoreState, HomeAssistant
+from homeassistant.helpers.entity import Entity
+
+from custom_components.ha_tion_btle import TionInstance, models
+from custom_components.ha_tion_btle.const import DOMAIN
+
+from .fake_tion import FakeFleet
+
+
+class Counters:
+    """State writes done by entities"""
+
+    def __init__(self):
+        self.state_writes: int = 0
+
+
+class LoopMonitor:
+    """Measures how long event loop was blocked: lag of periodic wakeups"""
+
+    def __init__(self, interval: float = 0.01):
+        self._interval: float = interval
+        self._task: asyncio.Task | None = None
+        self.blocked_total: float = 0.0
+        self.blocked_max: float = 0.0
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            lag = time.perf_counter() - started - self._interval
+            if lag > 0.001:
+                self.blocked_total += lag
+                self.blocked_max = max(self.blocked_max, lag)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def reset(self):
+        self.blocked_total = 0.0
+        self.blocked_max = 0.0
+
+
+class Bench:
+    """Running Home Assistant with fake bluetooth and fake breezers"""
+
+    def __init__(self, hass: HomeAssistant, fleet: FakeFleet, counters: Counters):
+        self.hass: HomeAssistant = hass
+        self.fleet: FakeFleet = fleet
+        self.counters: Counters = counters
+        self.advertisement_callbacks: dict[str, callable] = {}
+
+    @property
+    def instances(self) -> list[TionInstance]:
+        return [i for i in self.hass.data.get(DOMAIN, {}).values() if isinstance(i, TionInstance)]
+
+    def advertise(self, mac: str, rssi: int = -60):
+        """Simulate advertisement from breezer"""
+        device = self.fleet.devices[mac]
+        if device.hidden or mac not in self.advertisement_callbacks:
+            return
+        info = SimpleNamespace(device=self.fleet.ble_device(mac), rssi=rssi, source=device.source)
+        self.advertisement_callbacks[mac](info, None)
+
+    async def async_add_entry(self, mac: str, options: dict | None = None) -> config_entries.ConfigEntry:
+        device = self.fleet.devices[mac]
+        entry = config_entries.ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain=DOMAIN,
+            title=mac,
+            data={"model": device.model, "name": "Tion %s" % mac[-5:], "mac": mac, "pair": False},
+            options=options or {},
+            source=config_entries.SOURCE_USER,
+            unique_id=mac,
+        )
+        await self.hass.config_entries.async_add(entry)
+        return entry
+
+
+async def _async_start_hass(config_dir: str) -> HomeAssistant:
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    # real bluetooth stack is replaced by fake fleet
+    hass.config.components.add("bluetooth")
+    hass.set_state(CoreState.running)
+    return hass
+
+
+@contextlib.asynccontextmanager
+async def async_bench(fleet: FakeFleet):
+    """Start Home Assistant with Tion integration patched to use fleet instead of bluetooth."""
+    counters = Counters()
+    original_write = Entity.async_write_ha_state
+
+    def counting_write(entity: Entity) -> None:
+        counters.state_writes += 1
+        original_write(entity)
+
+    def fake_driver_class(_model: str):
+        def fake_driver(device):
+            address = device if isinstance(device, str) else device.address
+            return fleet.devices[address]
+        return fake_driver
+
+    bench: Bench | None = None
+
+    def register_callback(hass, callback, match_dict, mode):
+        bench.advertisement_callbacks[match_dict["address"]] = callback
+
+        def unregister() -> None:
+            if bench.advertisement_callbacks.get(match_dict["address"]) is callback:
+                del bench.advertisement_callbacks[match_dict["address"]]
+        return unregister
+
+    def last_service_info(_hass, mac, connectable=True):
+        device = fleet.devices.get(mac)
+        return SimpleNamespace(source=device.source, name=None) if device is not None else None
+
+    with tempfile.TemporaryDirectory() as config_dir, \
+            patch.object(Entity, "async_write_ha_state", counting_write), \
+            patch.object(models, "driver_class", fake_driver_class), \
+            patch.object(bluetooth, "async_ble_device_from_address",
+                         lambda _hass, mac, connectable=True: fleet.ble_device(mac)), \
+            patch.object(bluetooth, "async_last_service_info", last_service_info), \
+            patch.object(bluetooth, "async_scanner_devices_by_address",
+                         lambda _hass, mac, connectable=True: fleet.scanner_devices(mac)), \
+            patch.object(bluetooth, "async_register_callback", register_callback):
+        hass = await _async_start_hass(config_dir)
+        bench = Bench(hass, fleet, counters)
+        try:
+            yield bench
+        finally:
+            await hass.async_stop(force=True)
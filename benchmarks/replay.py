@@ -0,0 +1,249 @@
+"""Replay captured operations with real breezers through Tion integration.
+
+Capture is turned on by "capture" option of breezer; files are written to <config>/tion_captures. Every captured get
+and set is repeated in captured order via coordinator and entities, driver returns captured responses and errors.
+Usage (from repository root, with Home Assistant installed):
+
+    python -m benchmarks.replay tion_captures/aabbccddeeff.jsonl --speed max
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from bleak.exc import BleakError
+from tion_btle.tion import MaxTriesExceededError, TionException
+
+import custom_components.ha_tion_btle as integration
+from custom_components.ha_tion_btle.capture import CAPTURE_VERSION
+from custom_components.ha_tion_btle.const import DOMAIN, SCHEDULER, SCHEDULER_MAX_CONCURRENT
+from custom_components.ha_tion_btle.scheduler import TionScheduler
+
+from .fake_tion import FakeFleet, FakeTion
+from .harness import Bench, LoopMonitor, async_bench
+from .run import percentiles
+
+# captured exceptions that are raised again by replay; other ones are replayed as BleakError
+ERRORS: dict[str, type[BaseException]] = {
+    "TimeoutError": asyncio.TimeoutError,
+    "BleakError": BleakError,
+    "MaxTriesExceededError": MaxTriesExceededError,
+}
+
+# options that leave polls and writes to replay
+REPLAY_OPTIONS = {
+    "keep_alive": 86400,
+    "min_keep_alive": 86400,
+    "max_keep_alive": 86400,
+    "verify_writes": False,
+    "push_updates": False,
+    "capture": False,
+}
+
+
+def load_capture(path: Path) -> tuple[dict, list[dict]]:
+    """Header of the first session and operations of all sessions with continuous time"""
+    header: dict | None = None
+    records: list[dict] = []
+    offset = 0.0
+    for line in path.read_text().splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "v" in record:
+            if record["v"] != CAPTURE_VERSION:
+                raise ValueError("%s: unsupported capture version %s" % (path, record["v"]))
+            header = header or record
+            # next session starts right after the previous one
+            offset = records[-1]["t"] + records[-1]["d"] if records else 0.0
+            continue
+        record["t"] += offset
+        records.append(record)
+
+    if header is None:
+        raise ValueError("%s: capture header not found" % path)
+    return header, records
+
+
+def captured_error(text: str) -> BaseException:
+    name, _, message = text.partition(": ")
+    if name == "TionException":
+        return TionException("replay", message)
+    return ERRORS.get(name, BleakError)(message)
+
+
+class ReplayTion(FakeTion):
+    """Driver that repeats captured responses, errors and durations.
+
+    Operations are taken in captured order. Captured connects that are not needed (connection is reused in replay) are
+    skipped, connects that were not captured take no time.
+    """
+
+    def __init__(self, mac: str, model: str, records: list[dict], speed: float):
+        super().__init__(mac, model)
+        self.records: list[dict] = records
+        self.position: int = 0
+        # multiplier of captured durations, 0 for maximum speed
+        self.speed: float = speed
+        self.skipped: int = 0
+        self.mismatched: int = 0
+        # state for first refresh, before replay is started
+        self.replaying: bool = False
+        first = next((r for r in records if r["op"] == "get" and "r" in r), None)
+        if first is not None:
+            self.state = dict(first["r"])
+
+    def _next(self, op: str) -> dict | None:
+        while self.position < len(self.records) and self.records[self.position]["op"] == "connect" and op != "connect":
+            self.position += 1
+            self.skipped += 1
+        if self.position < len(self.records) and self.records[self.position]["op"] == op:
+            self.position += 1
+            return self.records[self.position - 1]
+        if op != "connect":
+            self.mismatched += 1
+        return None
+
+    async def _replay(self, op: str) -> dict | None:
+        record = self._next(op) if self.replaying else None
+        if record is None:
+            return None
+        if self.speed:
+            await asyncio.sleep(record["d"] * self.speed)
+        if "e" in record:
+            raise captured_error(record["e"])
+        return record
+
+    async def connect(self):
+        if self._connections <= 0:
+            self._connections = 0
+            self.airtime.connects += 1
+            await self._replay("connect")
+            self._connected = True
+        self._connections += 1
+
+    async def disconnect(self):
+        self._connections -= 1
+        if self._connections <= 0:
+            self._connected = False
+
+    async def get(self, skip_update: bool = False) -> dict:
+        if not skip_update:
+            self.airtime.gets += 1
+            record = await self._replay("get")
+            if record is not None and "r" in record:
+                self.state = dict(record["r"])
+        return dict(self.state)
+
+    async def set(self, new_settings: dict | None = None):
+        self.airtime.sets += 1
+        await self._replay("set")
+        self._apply(dict(new_settings or {}))
+
+
+async def async_replay_device(bench: Bench, device: ReplayTion, speed: float) -> dict:
+    instance = next(i for i in bench.instances if i.unique_id == device.mac)
+    latencies: dict[str, list[float]] = {"get": [], "set": []}
+    errors = 0
+    started = time.perf_counter()
+    device.replaying = True
+
+    for index, record in enumerate(device.records):
+        if record["op"] == "connect" or index < device.position:
+            # connects are replayed by operations, consumed operations were repeated by integration itself
+            continue
+        if speed:
+            await asyncio.sleep(max(record["t"] * speed - (time.perf_counter() - started), 0))
+
+        position = device.position
+        operation_started = time.perf_counter()
+        if record["op"] == "get":
+            await instance.async_refresh()
+            errors += 0 if instance.last_update_success else 1
+        else:
+            try:
+                await instance.set(**record.get("a", {}))
+            except Exception:
+                errors += 1
+        if device.position > position:
+            latencies[record["op"]].append(time.perf_counter() - operation_started)
+        else:
+            # rejected by breaker or served by connection that is already closed
+            device.skipped += 1
+
+    return {
+        "mac": device.mac,
+        "model": device.model,
+        "records": len(device.records),
+        "captured_seconds": device.records[-1]["t"] + device.records[-1]["d"] if device.records else 0.0,
+        "replay_seconds": time.perf_counter() - started,
+        "get_latency": percentiles(latencies["get"]),
+        "set_latency": percentiles(latencies["set"]),
+        "captured_errors": sum(1 for r in device.records if "e" in r and r["op"] != "connect"),
+        "replayed_errors": errors,
+        "skipped": device.skipped,
+        "mismatched": device.mismatched,
+        "breaker": instance.breaker.as_dict,
+    }
+
+
+async def async_main(args: argparse.Namespace) -> dict:
+    speed = 0.0 if args.speed == "max" else 1.0
+    fleet = FakeFleet(0)
+    for path in args.captures:
+        header, records = load_capture(Path(path))
+        fleet.devices[header["mac"]] = ReplayTion(header["mac"], header["model"], records, speed)
+
+    monitor = LoopMonitor()
+    with patch.object(integration, "SET_COALESCE_DELAY", integration.SET_COALESCE_DELAY * speed):
+        async with async_bench(fleet) as bench:
+            bench.hass.data.setdefault(DOMAIN, {})[SCHEDULER] = TionScheduler(
+                max_concurrent=SCHEDULER_MAX_CONCURRENT,
+                poll_stagger=0,
+            )
+            await asyncio.gather(*(bench.async_add_entry(mac, REPLAY_OPTIONS) for mac in fleet.devices))
+            while not all(i.data for i in bench.instances):
+                await asyncio.sleep(0.01)
+
+            monitor.start()
+            writes = bench.counters.state_writes
+            started = time.perf_counter()
+            devices = await asyncio.gather(*(async_replay_device(bench, d, speed) for d in fleet.devices.values()))
+            seconds = time.perf_counter() - started
+            monitor.stop()
+
+    return {
+        "speed": args.speed,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seconds": seconds,
+        "state_writes": bench.counters.state_writes - writes,
+        "loop_blocked_total": monitor.blocked_total,
+        "loop_blocked_max": monitor.blocked_max,
+        "devices": list(devices),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="capture files, one per breezer")
+    parser.add_argument("--speed", choices=("real", "max"), default="max",
+                        help="repeat captured timing or run operations back to back")
+    parser.add_argument("--output", default="replay_results.json", help="file for results (JSON)")
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, force=True)
+    args = parse_args()
+    report = asyncio.run(async_main(args))
+    Path(args.output).write_text(json.dumps(report, indent=2, default=str))
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
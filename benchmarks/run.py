@@ -0,0 +1,260 @@
+"""Benchmark Tion integration against simulated breezer fleets.
+
+Usage (from repository root, with Home Assistant installed):
+
+    python -m benchmarks.run --devices 1 5 15 --output benchmark_results.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from homeassistant.const import __version__ as HA_VERSION
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.ha_tion_btle.const import (
+    DOMAIN, SCHEDULER, SCHEDULER_MAX_CONCURRENT, SCHEDULER_POLL_STAGGER,
+)
+from custom_components.ha_tion_btle.scheduler import TionScheduler
+
+from .fake_tion import FakeFleet, Latency
+from .harness import Bench, LoopMonitor, async_bench
+
+ROOT = Path(__file__).parent.parent
+MANIFEST = ROOT / "custom_components" / DOMAIN / "manifest.json"
+
+# cold import of integration in fresh interpreter; Home Assistant modules it depends on are imported before timing
+IMPORT_SCRIPT = """
+import json, sys, time
+import homeassistant.components.bluetooth, homeassistant.components.climate, homeassistant.components.fan
+import homeassistant.components.select, homeassistant.components.sensor, homeassistant.helpers.update_coordinator
+
+def timed(*modules):
+    started = time.perf_counter()
+    for module in modules:
+        __import__(module)
+    return time.perf_counter() - started
+
+package = "custom_components.ha_tion_btle"
+result = {
+    "integration_seconds": timed(package),
+    "config_flow_seconds": timed(package + ".config_flow"),
+    "platforms_seconds": timed(*(package + "." + p for p in ("sensor", "climate", "select", "fan"))),
+    "driver_imported_with_integration": "tion_btle" in sys.modules,
+}
+result["driver_seconds"] = timed("tion_btle.s3", "tion_btle.s4", "tion_btle.lite")
+print(json.dumps(result))
+"""
+
+
+def percentiles(values: list[float]) -> dict[str, float | int | None]:
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p90": None, "p99": None, "max": None}
+
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": rank(50),
+        "p90": rank(90),
+        "p99": rank(99),
+        "max": ordered[-1],
+    }
+
+
+async def async_wait_for_first_state(bench: Bench, timeout: float) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if all(i.data and i.last_update_success for i in bench.instances):
+            break
+        await asyncio.sleep(0.01)
+    return time.perf_counter() - started
+
+
+async def async_bench_polls(bench: Bench, rounds: int) -> dict:
+    instances = bench.instances
+    writes_before = bench.counters.state_writes
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(i.async_refresh() for i in instances))
+    elapsed = time.perf_counter() - started
+    polls = len(instances) * rounds
+    return {
+        "polls": polls,
+        "seconds": elapsed,
+        "polls_per_second": polls / elapsed if elapsed else None,
+        "state_writes_per_poll": (bench.counters.state_writes - writes_before) / polls if polls else None,
+    }
+
+
+def entity_ids(bench: Bench, domain: str) -> list[str]:
+    registry = er.async_get(bench.hass)
+    return [e.entity_id for e in registry.entities.values() if e.platform == DOMAIN and e.domain == domain and
+            not e.disabled]
+
+
+async def async_bench_commands(bench: Bench, commands_per_device: int) -> dict:
+    """Send commands via entity services: every entity gets its commands one by one, entities work in parallel"""
+    latencies: list[float] = []
+
+    async def call(domain: str, service: str, data: dict):
+        started = time.perf_counter()
+        await bench.hass.services.async_call(domain, service, data, blocking=True)
+        latencies.append(time.perf_counter() - started)
+
+    async def climate(entity_id: str):
+        for i in range(commands_per_device):
+            await call("climate", "set_fan_mode", {"entity_id": entity_id, "fan_mode": str(i % 6 + 1)})
+            await call("climate", "set_temperature", {"entity_id": entity_id, "temperature": 15 + i % 10})
+
+    async def fan(entity_id: str):
+        for i in range(commands_per_device):
+            await call("fan", "set_percentage", {"entity_id": entity_id, "percentage": (i % 6 + 1) * 100 // 6})
+
+    async def select(entity_id: str):
+        for i in range(commands_per_device):
+            state = bench.hass.states.get(entity_id)
+            options = state.attributes.get("options") if state is not None else None
+            if options:
+                await call("select", "select_option", {"entity_id": entity_id, "option": options[i % len(options)]})
+
+    await asyncio.gather(
+        *(climate(e) for e in entity_ids(bench, "climate")),
+        *(fan(e) for e in entity_ids(bench, "fan")),
+        *(select(e) for e in entity_ids(bench, "select")),
+    )
+    return percentiles(latencies)
+
+
+async def async_bench_config_flow(bench: Bench, mac: str) -> float:
+    device = bench.fleet.devices[mac]
+    started = time.perf_counter()
+    await bench.hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": "user"},
+        data={"model": device.model, "name": "Tion flow", "mac": mac, "pair": False},
+    )
+    await bench.hass.async_block_till_done()
+    return time.perf_counter() - started
+
+
+def measure_import() -> dict:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(output.stdout)
+
+
+async def async_run_fleet(size: int, args: argparse.Namespace) -> dict:
+    # one extra device is added via config flow
+    fleet = FakeFleet(size + 1, Latency(args.connect, args.get, args.set), adapters=args.adapters)
+    macs = list(fleet.devices)
+    monitor = LoopMonitor()
+
+    async with async_bench(fleet) as bench:
+        bench.hass.data.setdefault(DOMAIN, {})[SCHEDULER] = TionScheduler(
+            max_concurrent=args.max_concurrent,
+            poll_stagger=args.poll_stagger,
+        )
+        monitor.start()
+
+        setup_latencies: list[float] = []
+
+        async def add_entry(mac: str):
+            entry_started = time.perf_counter()
+            await bench.async_add_entry(mac)
+            setup_latencies.append(time.perf_counter() - entry_started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(add_entry(mac) for mac in macs[:size]))
+        setup_time = time.perf_counter() - started
+        platforms = sum(len(i.platforms) for i in bench.instances)
+        first_state_time = setup_time + await async_wait_for_first_state(bench, args.timeout)
+
+        monitor.reset()
+        polls = await async_bench_polls(bench, args.rounds)
+        polls["loop_blocked_total"] = monitor.blocked_total
+        polls["loop_blocked_max"] = monitor.blocked_max
+
+        monitor.reset()
+        commands = await async_bench_commands(bench, args.commands)
+        commands["loop_blocked_total"] = monitor.blocked_total
+        commands["loop_blocked_max"] = monitor.blocked_max
+
+        config_flow_time = await async_bench_config_flow(bench, macs[size])
+        monitor.stop()
+
+        airtime = fleet.airtime
+        return {
+            "devices": size,
+            "models": {m: sum(1 for d in macs[:size] if fleet.devices[d].model == m) for m in ("S3", "S4", "Lite")},
+            "setup_seconds": setup_time,
+            "setup_latency": percentiles(setup_latencies),
+            "platforms": platforms,
+            "first_state_seconds": first_state_time,
+            "polls": polls,
+            "command_latency": commands,
+            "config_flow_seconds": config_flow_time,
+            "airtime": {
+                "connects": airtime.connects,
+                "gets": airtime.gets,
+                "sets": airtime.sets,
+                "seconds": airtime.seconds,
+            },
+        }
+
+
+async def async_main(args: argparse.Namespace) -> dict:
+    results = []
+    for size in args.devices:
+        logging.getLogger(__name__).warning("Running benchmark for %d devices", size)
+        results.append(await async_run_fleet(size, args))
+
+    return {
+        "version": json.loads(MANIFEST.read_text())["version"],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "homeassistant": HA_VERSION,
+        "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+        "import": measure_import(),
+        "results": results,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 5, 15], help="fleet sizes to benchmark")
+    parser.add_argument("--rounds", type=int, default=3, help="poll rounds for every fleet")
+    parser.add_argument("--commands", type=int, default=3, help="commands for every entity")
+    parser.add_argument("--adapters", type=int, default=1, help="bluetooth adapters or proxies used by fleet")
+    parser.add_argument("--max-concurrent", type=int, default=SCHEDULER_MAX_CONCURRENT,
+                        help="simultaneous operations per adapter")
+    parser.add_argument("--poll-stagger", type=float, default=SCHEDULER_POLL_STAGGER,
+                        help="seconds between poll starts per adapter")
+    parser.add_argument("--connect", type=float, default=0.5, help="simulated connect time")
+    parser.add_argument("--get", type=float, default=0.3, help="simulated state request time")
+    parser.add_argument("--set", type=float, default=0.4, help="simulated state change time")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for first state of fleet")
+    parser.add_argument("--output", default="benchmark_results.json", help="file for results (JSON)")
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, force=True)
+    args = parse_args()
+    report = asyncio.run(async_main(args))
+    Path(args.output).write_text(json.dumps(report, indent=2, default=str))
+    print(json.dumps({"import": report["import"], "results": report["results"]}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
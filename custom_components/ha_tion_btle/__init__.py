@@ -1,37 +1,69 @@
 """The Tion breezer component."""
 from __future__ import annotations
 
-from bleak.backends.device import BLEDevice
+import asyncio
 import datetime
 import logging
 import math
+import time
+from contextlib import asynccontextmanager
 from datetime import timedelta
 from functools import cached_property
+from typing import TYPE_CHECKING
 
-import tion_btle
 from homeassistant.components import bluetooth
 from homeassistant.components.bluetooth import BluetoothCallbackMatcher
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from tion_btle.tion import Tion, MaxTriesExceededError
-from .const import DOMAIN, TION_SCHEMA, CONF_KEEP_ALIVE, CONF_AWAY_TEMP, CONF_MAC, PLATFORMS
+from .const import (
+    DOMAIN, TION_SCHEMA, CONF_KEEP_ALIVE, CONF_AWAY_TEMP, CONF_MAC, PLATFORMS, SET_COALESCE_DELAY,
+    CONF_IDLE_TIMEOUT, CONF_MIN_KEEP_ALIVE, CONF_MAX_KEEP_ALIVE, FAST_POLL_PERIOD, BREAKER_THRESHOLD,
+    BREAKER_BASE_DELAY, BREAKER_MAX_DELAY, FRESH_ADVERTISEMENT_GAP, CONF_VERIFY_WRITES, VERIFY_WRITE_DELAY,
+    STORAGE_VERSION, STORAGE_SAVE_DELAY, CONF_PUSH_UPDATES, SHUTDOWN_TIMEOUT, CONF_CAPTURE,
+)
+from .breaker import CircuitBreaker, FAILURE_UNKNOWN
+from .capture import CaptureRecorder
+from .derived import DerivedMetrics
+from .metrics import TionMetrics
+from .models import DEFAULT_MODEL, TionModel, async_load_driver, create_driver, get_model
+from .polling import AdaptivePolling
+from .probe import async_take_probe
+from .scheduler import TionScheduler, PRIORITY_POLL, PRIORITY_WRITE, async_get_scheduler
+from .services import async_setup_services
+from .sources import SourceStatistics, connection_source
+from .tracing import Tracer, async_get_tracer, event as trace_event
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+
+if TYPE_CHECKING:
+    from tion_btle.tion import Tion
 
 _LOGGER = logging.getLogger(__name__)
 
+# parameters that are changed by user, not by environment. Poll faster if one of them was changed.
+CONTROL_KEYS = ("is_on", "heater", "heater_temp", "fan_speed", "mode")
+
 
 async def async_setup(hass, config):
+    async_setup_services(hass)
     return True
 
 
 async def async_setup_entry(hass, config_entry: ConfigEntry):
     _LOGGER.info("Setting up %s ", config_entry.unique_id)
 
-    hass.data.setdefault(DOMAIN, {})
+    async_get_scheduler(hass)
+    # tion_btle is imported by executor, so slow import of driver doesn't block event loop
+    await async_load_driver(hass, config_entry.data.get("model", DEFAULT_MODEL))
 
     instance = TionInstance(hass, config_entry)
     hass.data[DOMAIN][config_entry.unique_id] = instance
+    await instance.async_restore_state()
     config_entry.async_on_unload(
         bluetooth.async_register_callback(
             hass=hass,
@@ -41,53 +73,168 @@ async def async_setup_entry(hass, config_entry: ConfigEntry):
         )
     )
 
-    await hass.data[DOMAIN][config_entry.unique_id].async_config_entry_first_refresh()
+    config_entry.async_on_unload(hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, instance.async_stop))
+    config_entry.async_on_unload(config_entry.add_update_listener(async_update_options))
 
-    await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    # entities are registered with unknown state; first state is requested in background, so slow or absent breezers
+    # don't delay setup of Home Assistant and other breezers
+    instance.platforms = _async_enabled_platforms(hass, config_entry)
+    await hass.config_entries.async_forward_entry_setups(config_entry, instance.platforms)
+    instance.async_start_first_refresh()
     return True
 
 
+async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
+    """Remove entities, stop operations with breezer and disconnect from it"""
+    _LOGGER.info("Unloading %s", config_entry.unique_id)
+    instance: TionInstance = hass.data[DOMAIN][config_entry.unique_id]
+    if not await hass.config_entries.async_unload_platforms(config_entry, instance.platforms):
+        return False
+
+    hass.data[DOMAIN].pop(config_entry.unique_id)
+    await instance.async_shutdown()
+    return True
+
+
+@callback
+def _async_enabled_platforms(hass: HomeAssistant, config_entry: ConfigEntry) -> list[Platform]:
+    """Platforms that have enabled entities of breezer.
+
+    Platforms without registered entities (new breezer, new platform) are set up too. Enabling entity reloads entry, so
+    its platform is set up then.
+    """
+    enabled: dict[str, bool] = {}
+    for entity in er.async_entries_for_config_entry(er.async_get(hass), config_entry.entry_id):
+        enabled[entity.domain] = enabled.get(entity.domain, False) or entity.disabled_by is None
+
+    platforms = [platform for platform in PLATFORMS if enabled.get(platform, True)]
+    if len(platforms) < len(PLATFORMS):
+        _LOGGER.debug("%s has no enabled entities in %s, skipping them", config_entry.unique_id,
+                      [platform for platform in PLATFORMS if platform not in platforms])
+    return platforms
+
+
+async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Apply changed options to running breezer. Entities are named after breezer, so new name needs reload."""
+    instance: TionInstance = hass.data[DOMAIN][config_entry.unique_id]
+    if instance.config.get('name', instance.name) != instance.name:
+        await hass.config_entries.async_reload(config_entry.entry_id)
+        return
+
+    instance.async_apply_options()
+
+
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Forget saved state of removed breezer"""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.unique_id}").async_remove()
+
+
 class TionInstance(DataUpdateCoordinator):
     def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry):
 
         self._config_entry: ConfigEntry = config_entry
+        # platforms that are set up for breezer
+        self.platforms: list[Platform] = PLATFORMS
 
         assert self.config[CONF_MAC] is not None
         # https://developers.home-assistant.io/docs/network_discovery/#fetching-the-bleak-bledevice-from-the-address
         btle_device = bluetooth.async_ble_device_from_address(hass, self.config[CONF_MAC], connectable=True)
-        if btle_device is None:
-            raise ConfigEntryNotReady
-
-        self.__keep_alive: int = 60
-        try:
-            self.__keep_alive = self.config[CONF_KEEP_ALIVE]
-        except KeyError:
-            pass
+        # set when breezer was seen by any connectable scanner
+        self._device_seen = asyncio.Event()
+        # breezer that was connected and polled by config flow right before creating this entry
+        probe = async_take_probe(hass, self.config[CONF_MAC])
+        if btle_device is not None or probe is not None:
+            self._device_seen.set()
+
+        self._polling = AdaptivePolling(
+            min_interval=self.config_value(CONF_MIN_KEEP_ALIVE),
+            base_interval=self.config_value(CONF_KEEP_ALIVE),
+            max_interval=self.config_value(CONF_MAX_KEEP_ALIVE),
+            fast_period=FAST_POLL_PERIOD,
+        )
 
-        # delay before next update if we got btle.BTLEDisconnectError
-        self._delay: int = 600
+        # delays next polls after failures
+        self.breaker = CircuitBreaker(
+            threshold=BREAKER_THRESHOLD,
+            base_delay=BREAKER_BASE_DELAY,
+            max_delay=BREAKER_MAX_DELAY,
+        )
+        self._last_advertisement: float = time.monotonic()
 
-        self.__tion: Tion = self.getTion(self.model, btle_device)
-        self.__keep_alive = datetime.timedelta(seconds=self.__keep_alive)
-        self._delay = datetime.timedelta(seconds=self._delay)
+        if probe is not None:
+            self.__tion: Tion = probe.tion
+        else:
+            # driver may be created with MAC only: it will get BLEDevice with first advertisement
+            self.__tion: Tion = create_driver(self.model,
+                                              btle_device if btle_device is not None else self.config[CONF_MAC])
         self.rssi: int = 0
 
+        # keys changed by last update of listeners
+        self.changed_keys: set[str] = set()
+        self._published: dict = {}
+
+        # values that were written, but not confirmed by breezer yet
+        self._unverified: dict = {}
+        self._cancel_verification = None
+
+        # all operations with breezers are going via shared scheduler
+        self._scheduler: TionScheduler = async_get_scheduler(hass)
+        self._tracer: Tracer = async_get_tracer(hass)
+        # operations are written to capture file while capture option is on
+        self._capture: CaptureRecorder | None = None
+        service_info = bluetooth.async_last_service_info(hass, self.config[CONF_MAC], connectable=True)
+        # scanner or proxy that is expected to carry next connection (its slot is taken in scheduler) or carries it now
+        self._adapter: str = service_info.source if service_info is not None else "default"
+        # scanner or proxy that carried the last connection, if Home Assistant reported it
+        self._connection_source: str | None = None
+        self._sources = SourceStatistics()
+
+        # state changes waiting for write to the breezer
+        self._pending_set: dict = {}
+        self._pending_set_waiters: list[asyncio.Future] = []
+        self._set_task: asyncio.Task | None = None
+
+        # connection session: one operation with breezer at a time, connection is kept while session is not idle
+        self._session_lock = asyncio.Lock()
+        # connection of probed breezer is taken over, so first refresh doesn't reconnect
+        self._connected: bool = probe is not None
+        self._probed_state: dict | None = probe.data if probe is not None else None
+        self._cancel_idle_disconnect = None
+        # task that holds session now; it is cancelled on unload
+        self._session_task: asyncio.Task | None = None
+        self._stopped: bool = False
+        # breezer sent state without request during current connection, so polls are only a safety net
+        self._push_active: bool = False
+        self.metrics = TionMetrics()
+        # airflow, heater load and filter wear computed from state snapshots
+        self._derived = DerivedMetrics(self.capabilities.airflow)
+
         if self._config_entry.unique_id is None:
-            _LOGGER.critical(f"Unique id is None for {self._config_entry.title}! "
-                             f"Will fix it by using {self.unique_id}")
+            # entry is fixed before instance is registered, so platforms find it by new unique id
+            _LOGGER.warning(f"Unique id is None for {self._config_entry.title}! "
+                            f"Will fix it by using {self.unique_id}")
             hass.config_entries.async_update_entry(
                 entry=self._config_entry,
                 unique_id=self.unique_id,
             )
-            _LOGGER.critical("Done! Please restart Home Assistant.")
 
         super().__init__(
             name=self.config['name'] if 'name' in self.config else TION_SCHEMA['name']['default'],
             hass=hass,
             logger=_LOGGER,
-            update_interval=self.__keep_alive,
+            update_interval=self._polling.interval,
             update_method=self.async_update_state,
         )
+        # no state before first refresh
+        self.data = {}
+
+        # last known state is saved to disk, so entities have state right after restart
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{self.unique_id}")
+        self._async_update_capture()
+        # when current state was got from breezer
+        self.state_timestamp: datetime.datetime | None = None
+        # current state is restored from disk and was not confirmed by breezer yet
+        self.state_restored: bool = False
 
     @property
     def config(self) -> dict:
@@ -108,41 +255,279 @@ class TionInstance(DataUpdateCoordinator):
         return True if state == "on" else False
 
     async def async_update_state(self):
-        self.logger.info("Tion instance update started")
+        with self._tracer.span(self.unique_id, "poll"):
+            return await self._async_update_state()
+
+    async def _async_update_state(self):
+        self.logger.debug("Updating state of %s", self.unique_id)
         response: dict[str, str | bool | int] = {}
 
+        if not self._device_seen.is_set():
+            # state is got after first advertisement; until then entities keep restored (or unknown) state
+            trace_event("not seen yet, skipping poll")
+            return self.data
+
+        if not self.breaker.allow_request():
+            self.update_interval = datetime.timedelta(seconds=self.breaker.retry_in)
+            raise UpdateFailed("Breezer is not responding, next try in %.0f seconds" % self.breaker.retry_in)
+
         try:
-            response = await self.__tion.get()
-            self.update_interval = self.__keep_alive
-
-        except MaxTriesExceededError as e:
-            _LOGGER.critical("Got exception %s", str(e))
-            _LOGGER.critical("Will delay next check")
-            self.update_interval = self._delay
-            raise UpdateFailed("MaxTriesExceededError")
+            async with self._async_session(PRIORITY_POLL) as tion:
+                response = await self._async_get(tion)
+
         except Exception as e:
-            _LOGGER.critical(f"{response=}, {e=}")
-            raise e
+            kind = self._record_failure(e)
+            self.update_interval = datetime.timedelta(seconds=self.breaker.retry_in)
+            _LOGGER.warning("Could not get state of %s (%s: %s). Breaker is %s, will try again in %.0f seconds",
+                            self.unique_id, kind, e, self.breaker.state, self.breaker.retry_in)
+            if kind == FAILURE_UNKNOWN:
+                raise e
+            raise UpdateFailed(kind) from e
+
+        self._record_success()
+        response = self._process_response(response)
+        # empty or restored state is not a read from breezer, so first poll after start is not an activity
+        previous = self.data if self.data and not self.state_restored else None
+        self._async_save_state(response)
+
+        self._polling.polled(changed=previous is not None and any(
+            previous.get(k) != response.get(k) for k in CONTROL_KEYS
+        ))
+        self.update_interval = self._poll_interval
+
+        trace_event("next poll in %s", self.update_interval)
+        self.logger.debug("Result is %s", response)
+        return response
+
+    @callback
+    def async_start_first_refresh(self) -> None:
+        """Start getting first state in background.
+
+        Startup of Home Assistant doesn't wait for background task, so breezer that is not seen yet doesn't hold it.
+        Task is cancelled when entry is unloaded.
+        """
+        self._config_entry.async_create_background_task(
+            self.hass, self._async_first_refresh(), name=f"{DOMAIN} first refresh of {self.unique_id}"
+        )
+
+    async def _async_first_refresh(self):
+        if self._probed_state is not None:
+            await self._async_use_probed_state()
+            return
+
+        if not self._device_seen.is_set():
+            _LOGGER.info("%s was not seen yet. Will get state after first advertisement.", self.unique_id)
+            await self._device_seen.wait()
+
+        # concurrency is limited by shared scheduler
+        await self.async_refresh()
+
+    async def _async_use_probed_state(self):
+        """Publish state got by config flow and treat its connection as connection of finished session."""
+        _LOGGER.debug("Using state of %s got while adding it", self.unique_id)
+        response, self._probed_state = self._probed_state, None
+        async with self._session_lock:
+            await self._async_release_connection()
+
+        self._record_success()
+        response = self._process_response(response)
+        self._async_save_state(response)
+        self.async_set_updated_data(response)
+
+    async def async_restore_state(self):
+        """Use last known state saved before restart until breezer will be polled."""
+        stored = await self._store.async_load()
+        if not stored or not stored.get("data"):
+            return
+
+        self.data = stored["data"]
+        self._derived.restore(stored.get("derived", {}))
+        self.state_timestamp = dt_util.parse_datetime(stored["timestamp"])
+        self.state_restored = True
+        _LOGGER.debug("Restored state of %s from %s", self.unique_id, self.state_timestamp)
+
+    @callback
+    def _async_save_state(self, state: dict):
+        """Save state got from breezer. Writes are delayed and collected; pending write is done on shutdown."""
+        self.state_timestamp = dt_util.utcnow()
+        self.state_restored = False
+        self._store.async_delay_save(
+            lambda: {
+                "timestamp": self.state_timestamp.isoformat(),
+                "data": state,
+                "derived": self._derived.as_dict(),
+            },
+            STORAGE_SAVE_DELAY,
+        )
+
+    def _record_success(self):
+        self.breaker.success()
+        self.metrics.success()
+        if self._connection_source is not None:
+            self._sources.success(self._connection_source)
 
+    def _record_failure(self, e: BaseException) -> str:
+        """Register failed operation
+
+        :return: kind of failure
+        """
+        self.metrics.failure()
+        if self._connection_source is not None:
+            self._sources.failure(self._connection_source)
+        return self.breaker.failure(e)
+
+    @property
+    def assumed_state(self) -> bool:
+        """Current state is not confirmed by breezer: last update failed or state was restored after restart"""
+        return not self.last_update_success or self.state_restored
+
+    def _process_response(self, response: dict) -> dict:
+        """Convert driver response to coordinator data"""
         response["is_on"]: bool = self._decode_state(response["state"])
         response["heater"]: bool = self._decode_state(response["heater"])
         response["is_heating"] = self._decode_state(response["heating"])
         response["filter_remain"] = math.ceil(response["filter_remain"])
         response["fan_speed"] = int(response["fan_speed"])
         response["rssi"] = self.rssi
-
-        self.logger.debug(f"Result is {response}")
+        response.update(self._derived.update(response))
         return response
 
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update listeners and remember which keys were changed since previous update."""
+        data = self.data or {}
+        self.changed_keys = {k for k in data.keys() | self._published.keys() if data.get(k) != self._published.get(k)}
+        self._published = dict(data)
+        super().async_update_listeners()
+
+    def has_changes(self, keys: frozenset[str]) -> bool:
+        """Was any of keys changed by last update"""
+        return not self.changed_keys.isdisjoint(keys)
+
+    @callback
+    def async_apply_options(self) -> None:
+        """Use changed options without recreating instance and its entities"""
+        _LOGGER.debug("Applying new options of %s: %s", self.unique_id, self._config_entry.options)
+        self._polling = AdaptivePolling(
+            min_interval=self.config_value(CONF_MIN_KEEP_ALIVE),
+            base_interval=self.config_value(CONF_KEEP_ALIVE),
+            max_interval=self.config_value(CONF_MAX_KEEP_ALIVE),
+            fast_period=FAST_POLL_PERIOD,
+        )
+        if self.breaker.failures == 0:
+            self.update_interval = self._poll_interval
+            self._schedule_refresh()
+
+        self._async_update_capture()
+        if self._connected:
+            # idle timeout or push updates may be changed
+            self.hass.async_create_task(self._async_reconsider_connection())
+        # entities take away temperature and other options from instance
+        self.async_update_listeners()
+
+    async def _async_reconsider_connection(self):
+        async with self._session_lock:
+            if not self._connected:
+                return
+            if self._cancel_idle_disconnect is not None:
+                self._cancel_idle_disconnect()
+                self._cancel_idle_disconnect = None
+            await self._async_release_connection()
+
+    async def async_stop(self, _event: Event) -> None:
+        """Home Assistant is stopping: disconnect without waiting for config entry unload"""
+        await self.async_shutdown()
+
+    async def async_shutdown(self) -> None:
+        """Stop polling, cancel operations with breezer and disconnect from it"""
+        if self._stopped:
+            return
+        self._stopped = True
+        await super().async_shutdown()
+
+        for cancel in (self._cancel_verification, self._cancel_idle_disconnect):
+            if cancel is not None:
+                cancel()
+        self._cancel_verification = self._cancel_idle_disconnect = None
+        self._unverified = {}
+
+        if self._set_task is not None:
+            self._set_task.cancel()
+        for waiter in self._pending_set_waiters:
+            waiter.cancel()
+        self._pending_set, self._pending_set_waiters = {}, []
+        if self._session_task is not None:
+            self._session_task.cancel()
+
+        try:
+            async with asyncio.timeout(SHUTDOWN_TIMEOUT):
+                async with self._session_lock:
+                    await self._async_disconnect()
+        except TimeoutError:
+            _LOGGER.warning("Could not disconnect from %s in %d seconds", self.unique_id, SHUTDOWN_TIMEOUT)
+        if self._capture is not None:
+            await self._capture.async_flush()
+        _LOGGER.debug("%s is stopped", self.unique_id)
+
+    def config_value(self, key: str):
+        """Value from config entry or default from TION_SCHEMA"""
+        return self.config[key] if key in self.config else TION_SCHEMA[key]['default']
+
     @property
     def away_temp(self) -> int:
         """Temperature for away mode"""
-        return self.config[CONF_AWAY_TEMP] if CONF_AWAY_TEMP in self.config else TION_SCHEMA[CONF_AWAY_TEMP]['default']
+        return self.config_value(CONF_AWAY_TEMP)
 
     async def set(self, **kwargs):
+        """Change breezer state.
+
+        Changes requested within SET_COALESCE_DELAY are merged (last value wins for every parameter) and written to
+        the breezer with single request. Returns when requested changes are written.
+        """
         if "fan_speed" in kwargs:
             kwargs["fan_speed"] = int(kwargs["fan_speed"])
 
+        self._pending_set.update(kwargs)
+        waiter = self.hass.loop.create_future()
+        self._pending_set_waiters.append(waiter)
+        if self._set_task is None:
+            self._set_task = self.hass.async_create_task(self._async_write_pending())
+
+        await waiter
+
+    async def _async_write_pending(self):
+        """Write all collected changes to the breezer and notify waiting callers."""
+        await asyncio.sleep(SET_COALESCE_DELAY)
+        with self._tracer.span(self.unique_id, "set"):
+            await self._async_write_collected()
+
+    async def _async_write_collected(self):
+        # changes requested after this point will be written by next task; it is handed off before session is opened,
+        # so failure of connection can't leave waiters (and all next writes) without result
+        request, self._pending_set = self._pending_set, {}
+        waiters, self._pending_set_waiters = self._pending_set_waiters, []
+        self._set_task = None
+
+        try:
+            async with self._async_session(PRIORITY_WRITE) as tion:
+                await self._async_write(tion, request)
+        except asyncio.CancelledError:
+            for waiter in waiters:
+                waiter.cancel()
+            raise
+        except Exception as e:
+            if not self._stopped:
+                self._record_failure(e)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _async_write(self, tion: Tion, kwargs: dict):
         original_args = kwargs.copy()
         if "is_on" in kwargs:
             kwargs["state"] = "on" if kwargs["is_on"] else "off"
@@ -150,29 +535,293 @@ class TionInstance(DataUpdateCoordinator):
         if "heater" in kwargs:
             kwargs["heater"] = "on" if kwargs["heater"] else "off"
 
-        args = ', '.join('%s=%r' % x for x in kwargs.items())
-        _LOGGER.info("Need to set: " + args)
-        await self.__tion.set(kwargs)
+        _LOGGER.debug("Need to set %s: %s", self.unique_id, kwargs)
+        trace_event("writing %s", kwargs)
+        started = time.monotonic()
+        try:
+            await tion.set(kwargs)
+        except Exception as e:
+            self._capture_operation("set", started, args=original_args, error=e)
+            raise
+        self._capture_operation("set", started, args=original_args)
+        self.metrics.set.add(time.monotonic() - started)
+        trace_event("written in %.3fs", time.monotonic() - started)
+        self._record_success()
         self.data.update(original_args)
-        self.async_update_listeners()
+        # breezer works in written state from now on: derived values (airflow, heater power) follow it right away
+        self.data.update(self._derived.update(self.data))
+        self._polling.activity()
+        self.update_interval = self._polling.interval
+        # publishes new state optimistically and reschedules next poll with new interval
+        self.async_set_updated_data(self.data)
+
+        if self.config_value(CONF_VERIFY_WRITES):
+            self._schedule_verification(original_args)
+
+    def _schedule_verification(self, written: dict):
+        """Read state from breezer a bit later and check that written values were applied."""
+        if written.get("fan_speed") == 0:
+            # tion_btle turns breezer off instead of setting zero speed
+            written = {k: v for k, v in written.items() if k != "fan_speed"}
+            written["is_on"] = False
+
+        self._unverified.update(written)
+        if self._cancel_verification is not None:
+            self._cancel_verification()
+        self._cancel_verification = async_call_later(self.hass, VERIFY_WRITE_DELAY, self._verification_timeout)
 
-    @staticmethod
-    def getTion(model: str, mac: str | BLEDevice) -> tion_btle.TionS3 | tion_btle.TionLite | tion_btle.TionS4:
-        if model == 'S3':
-            from tion_btle.s3 import TionS3 as Breezer
-        elif model == 'S4':
-            from tion_btle.s4 import TionS4 as Breezer
-        elif model == 'Lite':
-            from tion_btle.lite import TionLite as Breezer
-        else:
-            raise NotImplementedError("Model '%s' is not supported!" % model)
-        return Breezer(mac)
+    @callback
+    def _verification_timeout(self, _now):
+        self._cancel_verification = None
+        self.hass.async_create_task(self._async_verify_writes())
+
+    async def _async_verify_writes(self):
+        expected, self._unverified = self._unverified, {}
+        if not expected:
+            return
+
+        with self._tracer.span(self.unique_id, "verify", expected=expected):
+            await self._async_verify(expected)
+
+    async def _async_verify(self, expected: dict):
+        try:
+            async with self._async_session(PRIORITY_WRITE) as tion:
+                response = await self._async_get(tion)
+        except Exception as e:
+            self._record_failure(e)
+            _LOGGER.debug("Could not verify state of %s: %s. Next poll will do it.", self.unique_id, e)
+            return
+
+        self._record_success()
+        state = self._process_response(response)
+        self._async_save_state(state)
+        mismatch = {k: (v, state.get(k)) for k, v in expected.items() if state.get(k) != v}
+        trace_event("mismatch %s", mismatch)
+        if mismatch:
+            _LOGGER.warning("%s applied changes differently (requested, actual): %s", self.unique_id, mismatch)
+        self.async_set_updated_data(state)
+
+    async def _async_get(self, tion: Tion) -> dict:
+        """Request state from connected breezer"""
+        started = time.monotonic()
+        try:
+            response = await tion.get()
+        except Exception as e:
+            self._capture_operation("get", started, error=e)
+            raise
+        self._capture_operation("get", started, response=response)
+        self.metrics.get.add(time.monotonic() - started)
+        trace_event("got state in %.3fs", time.monotonic() - started)
+        return response
 
-    async def connect(self):
-        return await self.__tion.connect()
+    def _capture_operation(self, op: str, started: float, args: dict | None = None, response: dict | None = None,
+                           error: BaseException | None = None) -> None:
+        if self._capture is not None:
+            self._capture.record(op, started, args=args, response=response, error=error)
 
-    async def disconnect(self):
-        return await self.__tion.disconnect()
+    @callback
+    def _async_update_capture(self) -> None:
+        """Start or stop capture according to options"""
+        if self.config_value(CONF_CAPTURE) and self._capture is None:
+            self._capture = CaptureRecorder(self.hass, self.unique_id, self.model)
+            _LOGGER.info("Capturing operations with %s to %s", self.unique_id, self._capture.path)
+        elif not self.config_value(CONF_CAPTURE) and self._capture is not None:
+            capture, self._capture = self._capture, None
+            _LOGGER.info("Stopped capture of %s, %d operations are captured", self.unique_id, capture.records)
+            self.hass.async_create_task(capture.async_flush())
+
+    @property
+    def idle_timeout(self) -> int:
+        """Seconds to keep connection after last operation"""
+        return self.config_value(CONF_IDLE_TIMEOUT)
+
+    @property
+    def push_updates(self) -> bool:
+        """Connection is kept open and state is taken from notifications sent by breezer"""
+        return self.config_value(CONF_PUSH_UPDATES)
+
+    @property
+    def _poll_interval(self) -> datetime.timedelta:
+        """Next poll interval: slowest one while breezer reports changes itself"""
+        if self.push_updates and self._push_active:
+            return datetime.timedelta(seconds=self.config_value(CONF_MAX_KEEP_ALIVE))
+        return self._polling.interval
+
+    @callback
+    def _async_notification(self, frame: bytearray) -> None:
+        """Frame that breezer sent while nobody waited for response"""
+        if not self.push_updates:
+            return
+        self.hass.async_create_task(self._async_apply_notification(frame))
+
+    async def _async_apply_notification(self, frame: bytearray):
+        """Decode frame and publish reported state.
+
+        Driver keeps decoded state, so frame is decoded while holding session lock: poll or write doesn't use driver at
+        the same time and connection is not closed under it.
+        """
+        from . import push  # pylint: disable=import-outside-toplevel
+
+        async with self._session_lock:
+            if not self._connected or self._stopped:
+                return
+            if not push.decode_frame(self.__tion, frame):
+                return
+            with self._tracer.span(self.unique_id, "notification"):
+                # state is decoded already, driver doesn't communicate with breezer here
+                response = await self.__tion.get(skip_update=True)
+                trace_event("reported state %s", response)
+
+        self._push_active = True
+        self.metrics.notifications += 1
+        response = self._process_response(response)
+        self._async_save_state(response)
+        self.update_interval = self._poll_interval
+        # reschedules next poll as well
+        self.async_set_updated_data(response)
+
+    @asynccontextmanager
+    async def _async_session(self, priority: int):
+        """Exclusive access to connected breezer.
+
+        Connection is reused by sessions started within idle_timeout seconds after previous one. Lock is not
+        reentrant, so session must not be started while holding another one. Operation itself waits for a slot of
+        adapter in shared scheduler.
+        """
+        if priority == PRIORITY_POLL:
+            await self._scheduler.async_wait_poll_turn(self._adapter)
+
+        started = time.monotonic()
+        async with self._session_lock:
+            if self._stopped:
+                raise HomeAssistantError("Breezer %s is unloaded" % self.unique_id)
+            self._session_task = asyncio.current_task()
+            wait = time.monotonic() - started
+            self.metrics.lock_wait.add(wait)
+            trace_event("got session after %.3fs, connected: %s", wait, self._connected)
+            if self.breaker.failures > 0:
+                self.metrics.retries += 1
+
+            if self._cancel_idle_disconnect is not None:
+                self._cancel_idle_disconnect()
+                self._cancel_idle_disconnect = None
+
+            if not self._connected:
+                self._expect_source()
+
+            try:
+                async with self._scheduler.async_slot(self._adapter, self.unique_id, priority):
+                    trace_event("got slot of %s after %.3fs", self._adapter, time.monotonic() - started)
+                    await self._async_connect()
+                    yield self.__tion
+                    # kept connection takes over slot of operation
+                    await self._async_release_connection()
+            except BaseException:
+                # connection state is unknown after failure, so next session should start from scratch
+                await self._async_disconnect()
+                raise
+            finally:
+                self._session_task = None
+
+    async def _async_release_connection(self):
+        """Keep connection for idle_timeout seconds after session. Must be called while holding session lock.
+
+        Connection with notification listener is kept until it is lost or push updates are turned off. Kept connection
+        holds slot of adapter, so it is closed right away when other breezers wait for the slot.
+        """
+        if self._stopped:
+            await self._async_disconnect()
+            return
+        push_installed = False
+        if self.push_updates:
+            # push module imports driver, so it is not imported unless push updates are on
+            from . import push  # pylint: disable=import-outside-toplevel
+
+            push_installed = push.installed(self.__tion)
+        if (push_installed or self.idle_timeout > 0) and \
+                self._scheduler.connection_kept(self._adapter, self.unique_id, self._close_kept_connection):
+            if not push_installed:
+                self._cancel_idle_disconnect = async_call_later(self.hass, self.idle_timeout, self._idle_timeout)
+            return
+        await self._async_disconnect()
+
+    def _expect_source(self) -> None:
+        """Guess scanner or proxy for new connection, so operation waits for slot of the right one.
+
+        Home Assistant connects via scanner with the best RSSI that has free connection slot; the real one is known
+        after connection is opened.
+        """
+        candidates = bluetooth.async_scanner_devices_by_address(self.hass, self.unique_id, True)
+        if not candidates:
+            return
+        source = max(candidates, key=lambda d: d.advertisement.rssi).scanner.source
+        if source != self._adapter:
+            _LOGGER.debug("%s is expected to be connected via %s instead of %s", self.unique_id, source, self._adapter)
+            self._adapter = source
+
+    async def _async_connect(self):
+        if self._connected and self.__tion.connection_status == "disc":
+            _LOGGER.debug("Connection to %s was lost while idle", self.unique_id)
+            await self._async_disconnect()
+
+        if not self._connected:
+            if self.push_updates:
+                from . import push  # pylint: disable=import-outside-toplevel
+
+                # frames that come while session waits for response are left to driver
+                push.install(self.__tion, lambda: self._session_task is not None, self._async_notification)
+            # tion_btle counts connect() calls, so get() and set() will reuse this connection until we disconnect
+            started = time.monotonic()
+            self._connection_source = None
+            try:
+                await self.__tion.connect()
+            except Exception as e:
+                self._capture_operation("connect", started, error=e)
+                raise
+            self._capture_operation("connect", started)
+            self.metrics.connect.add(time.monotonic() - started)
+            self._connection_source = connection_source(self.__tion)
+            if self._connection_source is not None:
+                # kept connection holds slot of the source that really carries it
+                self._adapter = self._connection_source
+                self._sources.connected(self._connection_source, time.monotonic() - started)
+            trace_event("connected via %s in %.3fs", self._connection_source, time.monotonic() - started)
+            self.metrics.source = self._connection_source
+            self._connected = True
+
+    async def _async_disconnect(self):
+        if not self._connected:
+            self._scheduler.connection_closed(self.unique_id)
+            return
+
+        self._connected = False
+        self._push_active = False
+        try:
+            await self.__tion.disconnect()
+        except Exception as e:
+            _LOGGER.debug("Got %s while disconnecting from %s", e, self.unique_id)
+        finally:
+            # slot of kept connection is free only when it is closed
+            self._scheduler.connection_closed(self.unique_id)
+
+    @callback
+    def _idle_timeout(self, _now):
+        self._cancel_idle_disconnect = None
+        self.hass.async_create_task(self._async_close_idle_session())
+
+    @callback
+    def _close_kept_connection(self) -> None:
+        """Slot of kept connection is needed by other breezer"""
+        trace_event("closing kept connection: slot of %s is needed", self._adapter)
+        if self._cancel_idle_disconnect is not None:
+            self._cancel_idle_disconnect()
+            self._cancel_idle_disconnect = None
+        self.hass.async_create_task(self._async_close_idle_session())
+
+    async def _async_close_idle_session(self):
+        async with self._session_lock:
+            if self._cancel_idle_disconnect is None:
+                await self._async_disconnect()
 
     @property
     def device_info(self):
@@ -186,12 +835,23 @@ class TionInstance(DataUpdateCoordinator):
     def unique_id(self):
         return self.config[CONF_MAC]
 
+    @property
+    def adapter(self) -> str:
+        """Bluetooth adapter or proxy that is used for connections to breezer"""
+        return self._adapter
+
+    @property
+    def sources(self) -> dict[str, dict]:
+        """Statistics of scanners and proxies that hear breezer and carry connections to it"""
+        return self._sources.as_dict()
+
+    @cached_property
+    def capabilities(self) -> TionModel:
+        return get_model(self.model)
+
     @cached_property
     def supported_air_sources(self) -> list[str]:
-        if self.model == "S3":
-            return ["outside", "mixed", "recirculation"]
-        else:
-            return ["outside", "recirculation"]
+        return list(self.capabilities.air_sources)
 
     @cached_property
     def model(self) -> str:
@@ -200,8 +860,8 @@ class TionInstance(DataUpdateCoordinator):
         except KeyError:
             _LOGGER.warning(f"Model was not found in config. "
                             f"Please update integration settings! Config is {self.config}")
-            _LOGGER.warning("Assume that model is S3")
-            model = 'S3'
+            _LOGGER.warning("Assume that model is %s", DEFAULT_MODEL)
+            model = DEFAULT_MODEL
         return model
 
     @callback
@@ -212,4 +872,19 @@ class TionInstance(DataUpdateCoordinator):
     ) -> None:
         if service_info.device is not None:
             self.rssi = service_info.rssi
+            self._sources.advertisement(service_info.source, service_info.rssi)
+            if self._adapter == "default":
+                self._adapter = service_info.source
             self.__tion.update_btle_device(service_info.device)
+            self._device_seen.set()
+
+            now = time.monotonic()
+            if now - self._last_advertisement > FRESH_ADVERTISEMENT_GAP and self.breaker.device_reappeared():
+                _LOGGER.info("%s is advertising again, will try to get state now", self.unique_id)
+                self.hass.async_create_task(self.async_request_refresh())
+            self._last_advertisement = now
+
+    @property
+    def breaker_state(self) -> str:
+        """State of circuit breaker: closed, open or half_open"""
+        return self.breaker.state
@@ -0,0 +1,123 @@
+"""Circuit breaker for communication with Tion breezers"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+FAILURE_UNREACHABLE = "unreachable"
+FAILURE_NOT_FOUND = "not_found"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_NO_RESPONSE = "no_response"
+FAILURE_BLUETOOTH = "bluetooth"
+FAILURE_UNKNOWN = "unknown"
+
+# failures that mean there is no sense to try again right now
+_OPEN_IMMEDIATELY = (FAILURE_NOT_FOUND,)
+
+# coordinator aligns refreshes to whole seconds, so retry may be started up to a second before backoff expires
+_EARLY_RETRY_TOLERANCE = 1.0
+
+
+def classify_failure(e: BaseException) -> str:
+    """Kind of failure for exception raised while communicating with breezer"""
+    # driver is imported already when its exceptions are raised
+    from bleak.exc import BleakError  # pylint: disable=import-outside-toplevel
+    from tion_btle.tion import MaxTriesExceededError, TionException  # pylint: disable=import-outside-toplevel
+
+    if isinstance(e, MaxTriesExceededError):
+        return FAILURE_UNREACHABLE
+    if isinstance(e, (asyncio.TimeoutError, TimeoutError)):
+        return FAILURE_TIMEOUT
+    if isinstance(e, TionException):
+        return FAILURE_NO_RESPONSE
+    if isinstance(e, BleakError):
+        return FAILURE_NOT_FOUND if "not found" in str(e).lower() else FAILURE_BLUETOOTH
+    return FAILURE_UNKNOWN
+
+
+class CircuitBreaker:
+    """Per-device circuit breaker with jittered exponential backoff.
+
+    closed: requests go to the breezer. Every failure delays next try by `base_delay * 2^(failures - 1)` seconds (but
+        not more than `max_delay`, +-`jitter` share). After `threshold` consecutive failures breaker opens.
+    open: requests are rejected without touching the breezer until backoff expires.
+    half_open: one probe request is allowed. Success closes breaker, failure opens it again with longer backoff.
+    """
+
+    def __init__(self, threshold: int, base_delay: float, max_delay: float, jitter: float = 0.2):
+        self._threshold: int = threshold
+        self._base_delay: float = base_delay
+        self._max_delay: float = max_delay
+        self._jitter: float = jitter
+
+        self.state: str = STATE_CLOSED
+        self.failures: int = 0
+        self.last_failure: str | None = None
+        self._retry_at: float = 0.0
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until next request should be tried"""
+        return max(self._retry_at - time.monotonic(), 0.0)
+
+    def allow_request(self) -> bool:
+        if self.state == STATE_OPEN and self.retry_in <= _EARLY_RETRY_TOLERANCE:
+            _LOGGER.debug("Backoff expired, breaker is half-open now")
+            self.state = STATE_HALF_OPEN
+        return self.state != STATE_OPEN
+
+    def success(self) -> None:
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("Breezer is responding again after %d failures, breaker is closed", self.failures)
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.last_failure = None
+        self._retry_at = 0.0
+
+    def failure(self, e: BaseException) -> str:
+        """Register failed request.
+
+        :return: kind of failure
+        """
+        self.last_failure = classify_failure(e)
+        self.failures += 1
+
+        delay = min(self._base_delay * 2 ** (self.failures - 1), self._max_delay)
+        delay *= random.uniform(1 - self._jitter, 1 + self._jitter)
+        self._retry_at = time.monotonic() + delay
+
+        if self.state == STATE_HALF_OPEN or self.failures >= self._threshold or \
+                self.last_failure in _OPEN_IMMEDIATELY:
+            self.state = STATE_OPEN
+
+        _LOGGER.debug("Failure #%d (%s), breaker is %s, next try in %.0fs", self.failures, self.last_failure,
+                      self.state, delay)
+        return self.last_failure
+
+    def device_reappeared(self) -> bool:
+        """Breezer was seen again after silence: allow probe right now.
+
+        :return: should probe be started
+        """
+        if self.state != STATE_OPEN:
+            return False
+        self.state = STATE_HALF_OPEN
+        self._retry_at = 0.0
+        return True
+
+    @property
+    def as_dict(self) -> dict[str, str | int | float | None]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_failure": self.last_failure,
+            "retry_in": round(self.retry_in, 1),
+        }
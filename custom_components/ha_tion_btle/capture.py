@@ -0,0 +1,100 @@
+"""Capture of operations with breezer for offline replay (see benchmarks/replay.py)
+
+File is JSON lines. Every capture session starts with header:
+    {"v": 1, "mac": ..., "model": ..., "started": <ISO time>}
+followed by operations:
+    {"t": <seconds since session start>, "op": "connect" | "get" | "set", "d": <duration>, "a": <set arguments>,
+     "r": <driver response of get>, "e": <exception type and message>}
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .const import CAPTURE_DIR, CAPTURE_FLUSH_DELAY, CAPTURE_MAX_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+CAPTURE_VERSION = 1
+
+
+def capture_path(hass: HomeAssistant, mac: str) -> str:
+    return hass.config.path(CAPTURE_DIR, "%s.jsonl" % mac.replace(":", "").lower())
+
+
+class CaptureRecorder:
+    """Append-only capture file of one breezer.
+
+    Records are serialized immediately (driver response is changed later), collected in memory and written by
+    executor every CAPTURE_FLUSH_DELAY seconds. When file grows over CAPTURE_MAX_SIZE, it is moved to <name>.1
+    (replacing previous one), so at most two files are kept.
+    """
+
+    def __init__(self, hass: HomeAssistant, mac: str, model: str):
+        self.hass: HomeAssistant = hass
+        self.path: str = capture_path(hass, mac)
+        self._started: float = time.monotonic()
+        self._lines: list[str] = [self._dumps({
+            "v": CAPTURE_VERSION, "mac": mac, "model": model, "started": dt_util.utcnow().isoformat(),
+        })]
+        self._header: str = self._lines[0]
+        self._cancel_flush: CALLBACK_TYPE | None = None
+        self._write_lock = asyncio.Lock()
+        self.records: int = 0
+
+    @staticmethod
+    def _dumps(record: dict) -> str:
+        return json.dumps(record, separators=(",", ":"), default=str) + "\n"
+
+    @callback
+    def record(self, op: str, started: float, args: dict | None = None, response: dict | None = None,
+               error: BaseException | None = None) -> None:
+        """Add operation that was started at `started` (monotonic) and has just finished"""
+        now = time.monotonic()
+        record = {"t": round(started - self._started, 4), "op": op, "d": round(now - started, 4)}
+        if args is not None:
+            record["a"] = args
+        if response is not None:
+            record["r"] = response
+        if error is not None:
+            record["e"] = "%s: %s" % (type(error).__name__, error)
+        self._lines.append(self._dumps(record))
+        self.records += 1
+
+        if self._cancel_flush is None:
+            self._cancel_flush = async_call_later(self.hass, CAPTURE_FLUSH_DELAY, self._flush_timeout)
+
+    @callback
+    def _flush_timeout(self, _now) -> None:
+        self._cancel_flush = None
+        self.hass.async_create_task(self.async_flush())
+
+    async def async_flush(self) -> None:
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+            self._cancel_flush = None
+        async with self._write_lock:
+            lines, self._lines = self._lines, []
+            if lines:
+                await self.hass.async_add_executor_job(self._write, lines)
+
+    def _write(self, lines: list[str]) -> None:
+        data = "".join(lines).encode()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > CAPTURE_MAX_SIZE:
+                os.replace(self.path, self.path + ".1")
+                if not lines[0].startswith('{"v":'):
+                    # new file is replayable on its own
+                    data = self._header.encode() + data
+            with open(self.path, "ab") as f:
+                f.write(data)
+        except OSError as e:
+            _LOGGER.warning("Could not write capture to %s: %s", self.path, e)
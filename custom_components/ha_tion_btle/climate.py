@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Callable
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
@@ -16,6 +17,7 @@ from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import TionInstance
 from .const import *
+from .models import FEATURE_HEATER
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,19 +34,11 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     }
 )
 
-devices = []
-
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
     """Setup entry"""
     tion_instance: TionInstance = hass.data[DOMAIN][config_entry.unique_id]
-    unique_id = tion_instance.unique_id
-
-    if unique_id not in devices:
-        devices.append(unique_id)
-        async_add_entities([TionClimateEntity(hass, tion_instance)])
-    else:
-        _LOGGER.warning(f"Device {unique_id} is already configured! ")
+    async_add_entities([TionClimateEntity(hass, tion_instance)])
 
     platform = entity_platform.async_get_current_platform()
     platform.async_register_entity_service(
@@ -64,7 +58,6 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
     _attr_hvac_modes = [HVACMode.HEAT, HVACMode.FAN_ONLY, HVACMode.OFF]
     _attr_min_temp = 0
     _attr_max_temp = 30
-    _attr_fan_modes = [1, 2, 3, 4, 5, 6]
     _attr_precision = PRECISION_WHOLE
     _attr_target_temperature_step = 1
     _attr_temperature_unit = UnitOfTemperature.CELSIUS
@@ -74,6 +67,9 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
     _attr_icon = 'mdi:air-purifier'
     _attr_fan_mode: int
     coordinator: TionInstance
+    # coordinator keys that are used by entity
+    _tion_keys = frozenset(["heater_temp", "out_temp", "in_temp", "fan_speed", "air_mode", "is_on", "heater",
+                            "is_heating"])
 
     def __init__(self, hass: HomeAssistant, instance: TionInstance):
         CoordinatorEntity.__init__(
@@ -81,7 +77,9 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
             coordinator=instance,
         )
         self.hass: HomeAssistant = hass
-        self._away_temp = self.coordinator.away_temp
+        self._attr_fan_modes: list[int] = list(range(1, instance.capabilities.speed_count + 1))
+        if FEATURE_HEATER not in instance.capabilities.features:
+            self._attr_hvac_modes = [HVACMode.FAN_ONLY, HVACMode.OFF]
 
         # saved states
         self._last_mode: HVACMode | None = None
@@ -92,9 +90,8 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
         self._target_temp = None
         self._is_boost: bool = False
         self._fan_speed = 1
-
-        if self._away_temp:
-            self._attr_preset_modes.append(PRESET_AWAY)
+        # multi-step changes in progress: their state is published once, when all changes are written
+        self._transitions: int = 0
 
         self._attr_device_info = self.coordinator.device_info
         self._attr_name = self.coordinator.name
@@ -105,83 +102,86 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
 
     async def async_set_hvac_mode(self, hvac_mode: HVACMode):
         """Set hvac mode."""
-        _LOGGER.info("Need to set mode to %s, current mode is %s", hvac_mode, self.hvac_mode)
+        _LOGGER.debug("Need to set mode to %s, current mode is %s", hvac_mode, self.hvac_mode)
         if self.hvac_mode == hvac_mode:
             # Do nothing if mode is same
-            _LOGGER.debug(f"{self.name} is asked for mode {hvac_mode}, but it is already in {self.hvac_mode}. Do "
-                          f"nothing.")
+            _LOGGER.debug("%s is asked for mode %s, but it is already in it. Do nothing.", self.name, hvac_mode)
             pass
         elif hvac_mode == HVACMode.OFF:
             # Keep last mode while turning off. May be used while calling climate turn_on service
             self._last_mode = self.hvac_mode
-            await self._async_set_state(is_on=False)
+            await self._async_apply({'is_on': False})
 
         elif hvac_mode == HVACMode.HEAT:
-            saved_target_temp = self.target_temperature
-            try:
-                await self.coordinator.connect()
-                await self._async_set_state(heater=True, is_on=True)
-                if self.hvac_mode == HVACMode.FAN_ONLY:
-                    await self.async_set_temperature(**{ATTR_TEMPERATURE: saved_target_temp})
-            finally:
-                await self.coordinator.disconnect()
+            changes = {'heater': True, 'is_on': True}
+            if self.hvac_mode == HVACMode.FAN_ONLY and self.target_temperature is not None:
+                # heater should start with target temperature that was shown while it was off
+                changes['heater_temp'] = self.target_temperature
+            await self._async_apply(changes)
         elif hvac_mode == HVACMode.FAN_ONLY:
-            await self._async_set_state(heater=False, is_on=True)
+            await self._async_apply({'heater': False, 'is_on': True})
 
         else:
             _LOGGER.error("Unrecognized hvac mode: %s", hvac_mode)
             return
-        # Ensure we update the current operation after changing the mode
-        self._handle_coordinator_update()
 
     async def async_set_preset_mode(self, preset_mode: str):
-        """Set new preset mode."""
-        actions = []
+        """Set new preset mode.
+
+        All changes that are needed for new preset (temperature and fan speed) are written with one request.
+        """
+        changes = {}
+        target_fan_mode = None
+        saved = self._is_boost, self._saved_fan_mode, self._saved_target_temp, self._attr_preset_mode
+
+        def rollback():
+            # breezer didn't get new preset, so entity stays in the old one
+            self._is_boost, self._saved_fan_mode, self._saved_target_temp, self._attr_preset_mode = saved
+
         _LOGGER.debug("Going to change preset mode from %s to %s", self.preset_mode, preset_mode)
         if preset_mode == PRESET_AWAY and self.preset_mode != PRESET_AWAY:
             _LOGGER.info("Going to AWAY mode. Will save target temperature %s", self.target_temperature)
             self._saved_target_temp = self.target_temperature
-            actions.append([self._async_set_state, {'heater_temp': self._away_temp}])
+            changes['heater_temp'] = self.coordinator.away_temp
 
         if preset_mode != PRESET_AWAY and self.preset_mode == PRESET_AWAY and self._saved_target_temp:
             # retuning from away mode
             _LOGGER.info("Returning from AWAY mode: will set saved temperature %s", self._saved_target_temp)
-            actions.append([self._async_set_state, {'heater_temp': self._saved_target_temp}])
+            changes['heater_temp'] = self._saved_target_temp
             self._saved_target_temp = None
 
         if preset_mode == PRESET_SLEEP and self.preset_mode != PRESET_SLEEP:
             _LOGGER.info("Going to night mode: will save fan_speed: %s", self.fan_mode)
-            if self._saved_fan_mode is None:
+            # boost is replaced by sleep
+            self._is_boost = False
+            # fan speed is not known until first state is got from breezer
+            if self._saved_fan_mode is None and self.fan_mode is not None:
                 self._saved_fan_mode = int(self.fan_mode)
-            actions.append([self.async_set_fan_mode, {'fan_mode': min(int(self.fan_mode), self.sleep_max_fan_mode)}])
+            target_fan_mode = min(int(self.fan_mode), self.sleep_max_fan_mode) if self.fan_mode is not None else \
+                self.sleep_max_fan_mode
 
         if preset_mode == PRESET_BOOST and not self._is_boost:
             self._is_boost = True
-            if self._saved_fan_mode is None:
+            if self._saved_fan_mode is None and self.fan_mode is not None:
                 self._saved_fan_mode = int(self.fan_mode)
-            actions.append([self.async_set_fan_mode, {'fan_mode': self.boost_fan_mode}])
+            target_fan_mode = self.boost_fan_mode
 
         if self.preset_mode in [PRESET_BOOST, PRESET_SLEEP] and preset_mode not in [PRESET_BOOST, PRESET_SLEEP]:
             # returning from boost or sleep mode
-            _LOGGER.info("Returning from %s mode. Going to set fan speed %d", self.preset_mode, self._saved_fan_mode)
+            _LOGGER.info("Returning from %s mode. Going to set fan speed %s", self.preset_mode, self._saved_fan_mode)
             if self.preset_mode == PRESET_BOOST:
                 self._is_boost = False
 
             if self._saved_fan_mode is not None:
-                actions.append([self.async_set_fan_mode, {'fan_mode': self._saved_fan_mode}])
+                target_fan_mode = self._saved_fan_mode
                 self._saved_fan_mode = None
 
         self._attr_preset_mode = preset_mode
-        try:
-            await self.coordinator.connect()
-            for a in actions:
-                await a[0](**a[1])
-            self._attr_preset_mode = preset_mode
-            self._handle_coordinator_update()
-        finally:
-            await self.coordinator.disconnect()
+        if target_fan_mode is not None:
+            # limits of new preset are applied to fan speed
+            changes.update(self._fan_mode_changes(target_fan_mode))
 
-        self._handle_coordinator_update()
+        await self._async_apply(changes, rollback)
 
     @property
     def boost_fan_mode(self) -> int:
@@ -197,6 +197,12 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
         return 2
 
     async def async_set_fan_mode(self, fan_mode):
+        changes = self._fan_mode_changes(fan_mode)
+        if changes:
+            await self._async_apply(changes)
+
+    def _fan_mode_changes(self, fan_mode) -> dict:
+        """State changes for requested fan speed in current preset"""
         if self.preset_mode == PRESET_SLEEP:
             if int(fan_mode) > self.sleep_max_fan_mode:
                 _LOGGER.info("Fan speed %s was required, but I'm in SLEEP mode, so it should not be greater than %d",
@@ -206,9 +212,10 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
         if (self.preset_mode == PRESET_BOOST and self._is_boost) and fan_mode != self.boost_fan_mode:
             _LOGGER.debug("I'm in boost mode. Will ignore requested fan speed %s" % fan_mode)
             fan_mode = self.boost_fan_mode
-        if fan_mode != self.fan_mode or not self.coordinator.data.get("is_on"):
+        if str(fan_mode) != self.fan_mode or not self.coordinator.data.get("is_on"):
             self._fan_speed = fan_mode
-            await self._async_set_state(fan_speed=fan_mode, is_on=True)
+            return {'fan_speed': fan_mode, 'is_on': True}
+        return {}
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperature."""
@@ -216,13 +223,13 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
         if temperature is None:
             return
         self._target_temp = temperature
-        await self._async_set_state(heater_temp=temperature)
+        await self._async_apply({'heater_temp': temperature})
 
     async def async_turn_on(self):
         """
         Turn breezer on. Tries to restore last state. Use HEAT as backup
         """
-        _LOGGER.debug(f"Turning on from {self.hvac_mode} to {self._last_mode}")
+        _LOGGER.debug("Turning on from %s to %s", self.hvac_mode, self._last_mode)
         if self.hvac_mode != HVACMode.OFF:
             # do nothing if we already working
             pass
@@ -232,16 +239,50 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
             await self.async_set_hvac_mode(self._last_mode)
 
     async def async_turn_off(self):
-        _LOGGER.debug(f"Turning off from {self.hvac_mode}")
+        _LOGGER.debug("Turning off from %s", self.hvac_mode)
         await self.async_set_hvac_mode(HVACMode.OFF)
 
-    async def _async_set_state(self, **kwargs):
-        await self.coordinator.set(**kwargs)
-        self._handle_coordinator_update()
+    async def _async_apply(self, changes: dict, rollback: Callable[[], None] | None = None):
+        """Write all changes of transition with one request and publish resulting state once
+
+        State is published even if write fails: coordinator updates were not published during transition.
+
+        :param rollback: restores entity's own state that was changed for transition, called if write fails
+        """
+        try:
+            if changes:
+                self._transitions += 1
+                try:
+                    await self.coordinator.set(**changes)
+                finally:
+                    self._transitions -= 1
+        except Exception:
+            if rollback is not None:
+                rollback()
+            raise
+        finally:
+            self._write_current_state()
 
     def _handle_coordinator_update(self) -> None:
+        if self._transitions:
+            # state will be written when transition is finished
+            return
+        if self.coordinator.has_changes(self._tion_keys) or \
+                self._attr_assumed_state != self.coordinator.assumed_state or \
+                self._available_preset_modes() != self._attr_preset_modes:
+            self._write_current_state()
+
+    def _available_preset_modes(self) -> list[str]:
+        """Away preset is available while away temperature is set (it may be changed in options)"""
+        modes = [PRESET_NONE, PRESET_BOOST, PRESET_SLEEP]
+        if self.coordinator.away_temp:
+            modes.append(PRESET_AWAY)
+        return modes
+
+    def _write_current_state(self) -> None:
         self._get_current_state()
-        if int(self.fan_mode) != self.boost_fan_mode and (self._is_boost or self.preset_mode == PRESET_BOOST):
+        if self._attr_fan_mode is not None and int(self.fan_mode) != self.boost_fan_mode and \
+                (self._is_boost or self.preset_mode == PRESET_BOOST):
             _LOGGER.warning(f"I'm in boost mode, but current speed {self.fan_mode} is not equal boost speed "
                             f"{self.boost_fan_mode}. Dropping boost mode")
             self._is_boost = False
@@ -250,10 +291,11 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
         self.async_write_ha_state()
 
     def _get_current_state(self):
+        self._attr_preset_modes = self._available_preset_modes()
         self._attr_target_temperature = self.coordinator.data.get("heater_temp")
         self._attr_current_temperature = self.coordinator.data.get("out_temp")
         self._attr_fan_mode = self.coordinator.data.get("fan_speed")
-        self._attr_assumed_state = False if self.coordinator.last_update_success else True
+        self._attr_assumed_state = self.coordinator.assumed_state
         self._attr_extra_state_attributes = {
             'air_mode': self.coordinator.data.get("air_mode"),
             'in_temp': self.coordinator.data.get("in_temp")
@@ -269,17 +311,13 @@ class TionClimateEntity(ClimateEntity, CoordinatorEntity):
         return True
 
     async def set_air_source(self, source: str):
-        _LOGGER.debug(f"set_air_source: {source}")
+        _LOGGER.debug("set_air_source: %s", source)
         await self.coordinator.set(mode=source)
 
     @property
     def fan_mode(self) -> str | None:
-        return str(self._attr_fan_mode)
+        return str(self._attr_fan_mode) if self._attr_fan_mode is not None else None
 
     @property
     def fan_modes(self) -> list[str] | None:
         return [str(i) for i in self._attr_fan_modes]
-
-    @classmethod
-    def attr_fan_modes(cls) -> list[int] | None:
-        return cls._attr_fan_modes
@@ -3,19 +3,22 @@ from __future__ import annotations
 
 import logging
 import datetime
-import asyncio
+from typing import TYPE_CHECKING
 
-import bleak
-import tion_btle
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.components import bluetooth
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import callback, async_get_hass
-from tion_btle.tion import Tion
+from homeassistant.core import callback
 
-from .const import DOMAIN, TION_SCHEMA, CONF_MAC
+from .const import DOMAIN, TION_SCHEMA, CONF_MAC, DEFAULT_NAME
+from .models import async_create_connectable_driver
+from .probe import async_probe, async_store_probe, model_from_advertisement
+from .scheduler import PRIORITY_WRITE, async_get_scheduler
+
+if TYPE_CHECKING:
+    from tion_btle.tion import Tion
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,6 +33,7 @@ class TionFlow:
         self._data: dict = {}
         self._config_entry: ConfigEntry = {}
         self._retry: bool = False
+        self._discovered_model: str | None = None
 
     @staticmethod
     def __get_my_platform(config: dict):
@@ -93,24 +97,21 @@ class TionFlow:
             pass
         return data
 
-    @staticmethod
-    def getTion(model: str, mac: str) -> tion_btle.TionS3 | tion_btle.TionLite | tion_btle.TionS4:
-
-        btle_device = bluetooth.async_ble_device_from_address(hass=async_get_hass(), address=mac, connectable=True)
-        if btle_device is None:
-            message = f"Could not find device with {mac=}"
-            _LOGGER.critical(f"getTion: {message}")
-            raise bleak.BleakError(message)
-
-        if model == 'S3':
-            from tion_btle.s3 import TionS3 as Breezer
-        elif model == 'S4':
-            from tion_btle.s4 import TionS4 as Breezer
-        elif model == 'Lite':
-            from tion_btle.lite import TionLite as Breezer
-        else:
-            raise NotImplementedError("Model '%s' is not supported!" % model)
-        return Breezer(btle_device)
+    async def _async_probe(self, pair: bool):
+        """Make sure that breezer responds. Connection and state are handed over to the config entry.
+
+        Probe takes slot of adapter in shared scheduler like any other operation with breezer.
+
+        :raises Exception: breezer could not be paired or did not return its state in time
+        """
+        mac = self._data[CONF_MAC]
+        service_info = bluetooth.async_last_service_info(self.hass, mac, connectable=True)
+        adapter = service_info.source if service_info is not None else "default"
+        async with async_get_scheduler(self.hass).async_slot(adapter, mac, PRIORITY_WRITE):
+            _tion: Tion = await async_create_connectable_driver(self.hass, self._data['model'], mac)
+            result = await async_probe(_tion, pair)
+            _LOGGER.debug("Got state of %s while adding it: %s", mac, result)
+            async_store_probe(self.hass, mac, _tion, result, adapter)
 
 
 class TionConfigFlow(TionFlow, config_entries.ConfigFlow, domain=DOMAIN):
@@ -127,7 +128,7 @@ class TionConfigFlow(TionFlow, config_entries.ConfigFlow, domain=DOMAIN):
         return TionOptionsFlowHandler(config_entry)
 
     async def _create_entry(self, data, title, step: str):
-        if step in ["user", "pair"]:
+        if step in ["user", "pair", "bluetooth_confirm", "import"]:
             await self.async_set_unique_id(data["mac"])
             self._abort_if_unique_id_configured()
         return self.async_create_entry(title=title, data=data)
@@ -136,7 +137,6 @@ class TionConfigFlow(TionFlow, config_entries.ConfigFlow, domain=DOMAIN):
         """user initiates a flow via the user interface."""
 
         if input is not None:
-            result = {}
             self._data = input
             if input['pair']:
                 _LOGGER.debug("Showing pair info")
@@ -144,33 +144,72 @@ class TionConfigFlow(TionFlow, config_entries.ConfigFlow, domain=DOMAIN):
             else:
                 _LOGGER.debug("Going create entry with name %s" % input['name'])
                 _LOGGER.debug(input)
+                await self.async_set_unique_id(input[CONF_MAC])
+                self._abort_if_unique_id_configured()
                 try:
-                    _tion: Tion = self.getTion(input['model'], input['mac'])
-                    result = _tion.get()
+                    await self._async_probe(pair=False)
                 except Exception as e:
-                    _LOGGER.error("Could not get data from breezer. result is %s, error: %s" % (result, str(e)))
+                    _LOGGER.error("Could not get data from breezer. %s: %s", type(e).__name__, str(e))
                     return self.async_show_form(step_id='add_failed')
 
                 return await self._create_entry(title=input['name'], data=input, step="user")
 
         return self.async_show_form(step_id="user", data_schema=self.get_schema(TION_SCHEMA))
 
+    async def async_step_bluetooth(self, discovery_info: bluetooth.BluetoothServiceInfoBleak):
+        """Breezer was discovered by bluetooth integration"""
+        _LOGGER.debug("Discovered %s (%s)", discovery_info.name, discovery_info.address)
+        await self.async_set_unique_id(discovery_info.address)
+        self._abort_if_unique_id_configured()
+
+        self._discovered_model = model_from_advertisement(discovery_info)
+        self._data = {
+            CONF_MAC: discovery_info.address,
+            'name': discovery_info.name or DEFAULT_NAME,
+        }
+        self.context["title_placeholders"] = {"name": self._data['name'], "mac": discovery_info.address}
+        return await self.async_step_bluetooth_confirm()
+
+    async def async_step_bluetooth_confirm(self, input=None):
+        """Confirm adding of discovered breezer. Model is suggested by advertisement."""
+        if input is not None:
+            self._data.update(input)
+            if input['pair']:
+                _LOGGER.debug("Showing pair info")
+                return self.async_show_form(step_id="pair")
+
+            try:
+                await self._async_probe(pair=False)
+            except Exception as e:
+                _LOGGER.error("Could not get data from breezer. %s: %s", type(e).__name__, str(e))
+                return self.async_abort(reason="cannot_connect")
+
+            return await self._create_entry(title=self._data['name'], data=self._data, step="bluetooth_confirm")
+
+        model = {'default': self._discovered_model} if self._discovered_model is not None else {}
+        return self.async_show_form(
+            step_id="bluetooth_confirm",
+            data_schema=vol.Schema({
+                vol.Required('name', default=self._data['name']): TION_SCHEMA['name']['type'],
+                vol.Required('model', **model): TION_SCHEMA['model']['type'],
+                vol.Optional('pair', default=TION_SCHEMA['pair']['default']): TION_SCHEMA['pair']['type'],
+            }),
+            description_placeholders=self.context["title_placeholders"],
+        )
+
+    async def async_step_import(self, input):
+        """Breezer was paired and validated by provision service"""
+        _LOGGER.debug("Importing %s", input)
+        return await self._create_entry(title=input['name'], data=input, step="import")
+
     async def async_step_pair(self, input):
         """Pair host and breezer"""
         _LOGGER.debug("Real pairing step")
-        result = {}
         try:
             _LOGGER.debug(self._data)
-            _tion: Tion = self.getTion(self._data['model'], self._data['mac'])
-            await _tion.pair()
-            # We should sleep a bit, because immediately connection will cause device disconnected exception while
-            # enabling notifications
-            await  asyncio.sleep(3)
-
-            result = await _tion.get()
+            await self._async_probe(pair=True)
         except Exception as e:
-            _LOGGER.error("Cannot pair and get data. Data is %s, result is %s; %s: %s", self._data, result,
-                          type(e).__name__, str(e))
+            _LOGGER.error("Cannot pair and get data. Data is %s; %s: %s", self._data, type(e).__name__, str(e))
             return self.async_show_form(step_id='pair_failed')
 
         return await self._create_entry(title=self._data['name'], data=self._data, step="pair")
@@ -195,8 +234,6 @@ class TionOptionsFlowHandler(TionConfigFlow, config_entries.OptionsFlow):
         self._config_entry = config_entry
         self._entry_id = config_entry.entry_id
 
-        # config_entry.add_update_listener(update_listener)
-
     async def async_step_init(self, input=None):
         if input is not None:
             return await self._create_entry(title="", data=input, step="options")
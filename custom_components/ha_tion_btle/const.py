@@ -9,6 +9,8 @@ from homeassistant.components.climate.const import (
  )
 from homeassistant.const import (ATTR_TEMPERATURE, CONF_NAME, EVENT_HOMEASSISTANT_START, PRECISION_WHOLE, Platform, )
 from voluptuous import All, In
+
+from .models import MODELS
 DOMAIN = 'ha_tion_btle'
 DEFAULT_NAME = "Tion Breezer"
 
@@ -17,14 +19,70 @@ CONF_KEEP_ALIVE = "keep_alive"
 CONF_INITIAL_HVAC_MODE = "initial_hvac_mode"
 CONF_AWAY_TEMP = "away_temp"
 CONF_MAC = "mac"
+CONF_IDLE_TIMEOUT = "idle_timeout"
+CONF_MIN_KEEP_ALIVE = "min_keep_alive"
+CONF_MAX_KEEP_ALIVE = "max_keep_alive"
+CONF_VERIFY_WRITES = "verify_writes"
+CONF_PUSH_UPDATES = "push_updates"
+CONF_CAPTURE = "capture"
+# seconds between writing to breezer and reading state back for verification
+VERIFY_WRITE_DELAY = 3
+# key of shared TionScheduler in hass.data[DOMAIN]
+SCHEDULER = "scheduler"
+# simultaneous operations with breezers via one bluetooth adapter or proxy
+SCHEDULER_MAX_CONCURRENT = 2
+# minimal seconds between starts of polls via one bluetooth adapter or proxy
+SCHEDULER_POLL_STAGGER = 2
+# consecutive failures before breezer is considered dead and polls are suspended
+BREAKER_THRESHOLD = 3
+# delay (seconds) after first failure, doubled for every next one
+BREAKER_BASE_DELAY = 10
+BREAKER_MAX_DELAY = 1800
+# advertisement after this seconds of silence means that breezer is back
+FRESH_ADVERTISEMENT_GAP = 60
+STORAGE_VERSION = 1
+# seconds to collect state changes before saving last known state to disk
+STORAGE_SAVE_DELAY = 60
+# seconds to poll breezer with min_keep_alive interval after command or state change
+FAST_POLL_PERIOD = 60
+# key of breezers probed by config flow (waiting for their config entries) in hass.data[DOMAIN]
+PROBES = "probes"
+# directory (in config directory) for captures of operations with breezers
+CAPTURE_DIR = "tion_captures"
+# bytes of capture file before it is rotated
+CAPTURE_MAX_SIZE = 1024 * 1024
+# seconds to collect captured operations before writing them to file
+CAPTURE_FLUSH_DELAY = 10
+# key of shared Tracer in hass.data[DOMAIN]
+TRACER = "tracer"
+# spans of traced operations that are kept for dump
+TRACE_RING_SIZE = 500
+# key of breezer state snapshots (by name) taken by snapshot service in hass.data[DOMAIN]
+SNAPSHOTS = "snapshots"
+# seconds for pairing and getting first state while adding breezer
+PROBE_TIMEOUT = 30
+# seconds between connection attempts while breezer is getting ready after pairing
+PROBE_READY_INTERVAL = 0.5
+# seconds to keep connection to probed breezer until its config entry takes it over
+PROBE_HANDOFF_TIMEOUT = 60
+# seconds for disconnecting from breezer when integration is unloaded or Home Assistant stops
+SHUTDOWN_TIMEOUT = 5
+# seconds to wait for more state changes before writing them to the breezer in one request
+SET_COALESCE_DELAY = 0.3
 PLATFORMS = [Platform.SENSOR, Platform.CLIMATE, Platform.SELECT, Platform.FAN]
-SUPPORTED_DEVICES = ['S3', 'S4', 'Lite']
+SUPPORTED_DEVICES = list(MODELS)
 
 TION_SCHEMA = {
     'model': {'type': All(str, In(SUPPORTED_DEVICES)), 'required': True},
     'name': {'type': str, 'default': DEFAULT_NAME, 'required': True},
     CONF_MAC: {'type': str, 'required': True},
     CONF_KEEP_ALIVE: {'type': int, 'default': 60, 'required': False},
+    CONF_MIN_KEEP_ALIVE: {'type': int, 'default': 10, 'required': False},
+    CONF_MAX_KEEP_ALIVE: {'type': int, 'default': 300, 'required': False},
     CONF_AWAY_TEMP: {'type': int, 'default': 15, 'required': False},
+    CONF_IDLE_TIMEOUT: {'type': int, 'default': 30, 'required': False},
+    CONF_VERIFY_WRITES: {'type': bool, 'default': False, 'required': False},
+    CONF_PUSH_UPDATES: {'type': bool, 'default': False, 'required': False},
+    CONF_CAPTURE: {'type': bool, 'default': False, 'required': False},
     'pair': {'type': bool, 'default': True, 'required': False},
 }
\ No newline at end of file
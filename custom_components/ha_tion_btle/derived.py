@@ -0,0 +1,120 @@
+"""Metrics derived from breezer state snapshots: airflow, heater load and filter wear"""
+from __future__ import annotations
+
+import math
+import time
+
+# volumetric heat capacity of air, J/(m³·K)
+AIR_HEAT_CAPACITY = 1.2 * 1005
+# time constant (seconds) of heater duty cycle averaging
+DUTY_CYCLE_PERIOD = 3600
+# intervals between snapshots that are longer than this (seconds) are not accounted: state between them is unknown
+MAX_SNAPSHOT_GAP = 1800
+# seconds of observation before filter wear rate is reported
+FILTER_WEAR_MIN_PERIOD = 86400
+
+
+class DerivedMetrics:
+    """Incrementally updated metrics of one breezer.
+
+    Every snapshot closes an interval that started with the previous one; the interval is accounted with values of
+    its start, because breezer was in that state until it was polled again.
+    """
+
+    def __init__(self, airflow: tuple[int, ...]):
+        # nominal airflow (m³/h) for fan speeds from 1
+        self._airflow_table: tuple[int, ...] = airflow
+        self._previous: dict | None = None
+        self._previous_at: float | None = None
+
+        self.air_volume: float = 0.0
+        self.heater_energy: float = 0.0
+        self.heater_duty_cycle: float | None = None
+
+        # filter_remain (days) and time (seconds since epoch) when wear observation started
+        self._filter_reference: tuple[int, float] | None = None
+        self.filter_wear_rate: float | None = None
+
+    def airflow(self, snapshot: dict) -> int:
+        """Current airflow, m³/h"""
+        if not snapshot.get("is_on"):
+            return 0
+        speed = min(max(int(snapshot.get("fan_speed") or 0), 0), len(self._airflow_table))
+        return self._airflow_table[speed - 1] if speed > 0 else 0
+
+    def heater_power(self, snapshot: dict) -> float:
+        """Estimated power (W) needed to heat incoming air up to output temperature"""
+        if not snapshot.get("is_heating"):
+            return 0.0
+        delta = (snapshot.get("out_temp") or 0) - (snapshot.get("in_temp") or 0)
+        return max(delta, 0) * AIR_HEAT_CAPACITY * self.airflow(snapshot) / 3600
+
+    def restore(self, stored: dict) -> None:
+        """Continue accounting that was saved with last known state"""
+        self.air_volume = stored.get("air_volume", 0.0)
+        self.heater_energy = stored.get("heater_energy", 0.0)
+        self.heater_duty_cycle = stored.get("heater_duty_cycle")
+        if stored.get("filter_reference") is not None:
+            self._filter_reference = tuple(stored["filter_reference"])
+        self.filter_wear_rate = stored.get("filter_wear_rate")
+
+    def as_dict(self) -> dict:
+        """Accounting state for saving with last known state"""
+        return {
+            "air_volume": self.air_volume,
+            "heater_energy": self.heater_energy,
+            "heater_duty_cycle": self.heater_duty_cycle,
+            "filter_reference": self._filter_reference,
+            "filter_wear_rate": self.filter_wear_rate,
+        }
+
+    def update(self, snapshot: dict) -> dict:
+        """Account new snapshot.
+
+        :return: derived values for coordinator data
+        """
+        now = time.monotonic()
+        if self._previous is not None:
+            elapsed = now - self._previous_at
+            if 0 < elapsed <= MAX_SNAPSHOT_GAP:
+                self._account(self._previous, elapsed)
+        self._previous = dict(snapshot)
+        self._previous_at = now
+        self._update_filter_wear(snapshot.get("filter_remain"))
+
+        return {
+            "airflow": self.airflow(snapshot),
+            "air_volume": round(self.air_volume, 2),
+            "heater_power": round(self.heater_power(snapshot)),
+            "heater_energy": round(self.heater_energy, 3),
+            "heater_duty_cycle": round(self.heater_duty_cycle * 100, 1) if self.heater_duty_cycle is not None
+            else None,
+            "filter_wear_rate": round(self.filter_wear_rate, 2) if self.filter_wear_rate is not None else None,
+        }
+
+    def _account(self, state: dict, elapsed: float) -> None:
+        self.air_volume += self.airflow(state) * elapsed / 3600
+        # J -> kWh
+        self.heater_energy += self.heater_power(state) * elapsed / 3.6e6
+
+        heating = 1.0 if state.get("is_heating") else 0.0
+        if self.heater_duty_cycle is None:
+            self.heater_duty_cycle = heating
+        else:
+            self.heater_duty_cycle += (heating - self.heater_duty_cycle) * (1 - math.exp(-elapsed / DUTY_CYCLE_PERIOD))
+
+    def _update_filter_wear(self, remain: int | None) -> None:
+        """Days of filter life used per day"""
+        if remain is None:
+            return
+
+        now = time.time()
+        if self._filter_reference is None or remain > self._filter_reference[0]:
+            # first observation or filter was replaced
+            self._filter_reference = (remain, now)
+            self.filter_wear_rate = None
+            return
+
+        reference_remain, reference_at = self._filter_reference
+        if now - reference_at >= FILTER_WEAR_MIN_PERIOD:
+            self.filter_wear_rate = (reference_remain - remain) / ((now - reference_at) / 86400)
@@ -0,0 +1,37 @@
+"""Diagnostics support for Tion breezers"""
+from __future__ import annotations
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import TionInstance
+from .const import CONF_MAC, DOMAIN, SCHEDULER
+from .tracing import async_get_tracer
+
+TO_REDACT = {CONF_MAC}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry."""
+    instance: TionInstance = hass.data[DOMAIN][config_entry.unique_id]
+
+    return {
+        "config": async_redact_data(instance.config, TO_REDACT),
+        "data": instance.data,
+        "state_timestamp": instance.state_timestamp.isoformat() if instance.state_timestamp else None,
+        "state_restored": instance.state_restored,
+        "update_interval": instance.update_interval.total_seconds() if instance.update_interval else None,
+        "breaker": instance.breaker.as_dict,
+        "metrics": instance.metrics.as_dict(),
+        "sources": instance.sources,
+        "scheduler": hass.data[DOMAIN][SCHEDULER].stats,
+        "traces": [_redact_span(span) for span in async_get_tracer(hass).dump({instance.unique_id})],
+    }
+
+
+def _redact_span(span: dict) -> dict:
+    """Span without MAC: device is dropped and only sequence number is kept from span id"""
+    span = {k: v for k, v in span.items() if k != "device"}
+    span["id"] = span["id"].rpartition("#")[2]
+    return span
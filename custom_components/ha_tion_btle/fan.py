@@ -4,6 +4,7 @@ Fan controls for Tion breezers
 from __future__ import annotations
 
 import logging
+import math
 from datetime import timedelta
 from functools import cached_property
 from typing import Any
@@ -18,7 +19,6 @@ from homeassistant.helpers.entity_registry import async_get as async_get_entity_
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import TionInstance
-from .climate import TionClimateEntity
 from .const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
@@ -44,29 +44,9 @@ class TionFan(FanEntity, CoordinatorEntity):
     _attr_supported_features = FanEntityFeature.PRESET_MODE | FanEntityFeature.SET_SPEED
     _attr_oscillating = False
     _attr_preset_modes = [PRESET_NONE, PRESET_BOOST]
-    _attr_speed_count = 6  # Must be synced with TionClimateEntity._attr_fan_modes
     _attr_current_direction = DIRECTION_FORWARD
-    _mode_percent_mapping = {
-        0: 0,
-        1: 17,
-        2: 33,
-        3: 50,
-        4: 67,
-        5: 83,
-        6: 100,
-    }
-    _percent_mode_mapping = {
-        0: 0,
-        16: 1,
-        17: 1,
-        33: 2,
-        50: 3,
-        66: 4,
-        67: 4,
-        83: 5,
-        100: 6,
-    }
-    # Home Assistant is using float speed step and ceil to determinate supported speed percents.
+    # coordinator keys that are used by entity
+    _tion_keys = frozenset(["is_on", "fan_speed"])
 
     def set_preset_mode(self, preset_mode: str) -> None:
         pass
@@ -96,6 +76,16 @@ class TionFan(FanEntity, CoordinatorEntity):
         self._attr_unique_id = f"{instance.unique_id}-{description.key}"
         self._saved_fan_mode = None
 
+        self._attr_speed_count = instance.capabilities.speed_count
+        self._mode_percent_mapping = {
+            mode: round(mode * 100 / self._attr_speed_count) for mode in range(self._attr_speed_count + 1)
+        }
+        # Home Assistant is using float speed step and ceil to determinate supported speed percents.
+        self._percent_mode_mapping = {
+            math.floor(mode * 100 / self._attr_speed_count): mode for mode in range(self._attr_speed_count + 1)
+        }
+        self._percent_mode_mapping.update({percent: mode for mode, percent in self._mode_percent_mapping.items()})
+
         _LOGGER.debug(f"Init of fan  {self.name} ({instance.unique_id})")
         _LOGGER.debug(f"Speed step is {self.percentage_step}")
 
@@ -121,13 +111,13 @@ class TionFan(FanEntity, CoordinatorEntity):
         except KeyError:
             _LOGGER.warning(f"Could not to convert {percentage} to mode with {self._percent_mode_mapping}. "
                             f"Will use fall back method.")
-            for i in range(len(TionClimateEntity.attr_fan_modes())):
+            for i in range(self._attr_speed_count):
                 if percentage < self.percentage_step * i:
                     break
                 else:
                     result = i
             else:
-                result = 6
+                result = self._attr_speed_count
 
             return result
 
@@ -140,7 +130,7 @@ class TionFan(FanEntity, CoordinatorEntity):
 
     @cached_property
     def boost_fan_mode(self) -> int:
-        return max(TionClimateEntity.attr_fan_modes())
+        return self.coordinator.capabilities.speed_count
 
     @property
     def fan_mode(self):
@@ -171,7 +161,11 @@ class TionFan(FanEntity, CoordinatorEntity):
         await self.coordinator.set(is_on=False)
 
     def _handle_coordinator_update(self) -> None:
-        self._attr_assumed_state = False if self.coordinator.last_update_success else True
+        if not self.coordinator.has_changes(self._tion_keys) and \
+                self._attr_assumed_state == self.coordinator.assumed_state:
+            return
+
+        self._attr_assumed_state = self.coordinator.assumed_state
         self._attr_is_on = self.coordinator.data.get("is_on")
         self._attr_percentage = self.mode2percent() if self._attr_is_on else 0  # should check attr to avoid deadlock
         self.async_write_ha_state()
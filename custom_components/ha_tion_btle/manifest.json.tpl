@@ -12,6 +12,16 @@
   "codeowners": [
     "@IATkachenko"
   ],
+  "bluetooth": [
+    {
+      "local_name": "Breezer*",
+      "connectable": true
+    },
+    {
+      "local_name": "Tion*",
+      "connectable": true
+    }
+  ],
   "config_flow": true,
   "version": "%%%VERSION%%%"
 }
@@ -0,0 +1,120 @@
+"""Performance metrics of communication with Tion breezers"""
+from __future__ import annotations
+
+import bisect
+import datetime
+
+from homeassistant.util import dt as dt_util
+
+
+class Histogram:
+    """Histogram of durations (seconds) with fixed buckets"""
+
+    BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+    def __init__(self):
+        # last counter is for values greater than last bucket
+        self.counts: list[int] = [0] * (len(self.BUCKETS) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.last: float | None = None
+
+    def add(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.last = value
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p: float) -> float | None:
+        """Upper bound of bucket with p-th percentile"""
+        if not self.count:
+            return None
+
+        rank = p / 100 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.BUCKETS[i] if i < len(self.BUCKETS) else self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "buckets": list(self.BUCKETS) + ["inf"],
+            "counts": self.counts,
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class TionMetrics:
+    """Timings and results of operations with one breezer"""
+
+    def __init__(self):
+        self.connect = Histogram()
+        self.get = Histogram()
+        self.set = Histogram()
+        self.lock_wait = Histogram()
+        self.successes: int = 0
+        self.failures: int = 0
+        # operations started while previous ones were failing
+        self.retries: int = 0
+        # state frames that breezer sent without request
+        self.notifications: int = 0
+        self.last_success: datetime.datetime | None = None
+        # scanner or proxy that was used for last connection
+        self.source: str | None = None
+
+    def success(self) -> None:
+        self.successes += 1
+        self.last_success = dt_util.utcnow()
+
+    def failure(self) -> None:
+        self.failures += 1
+
+    @property
+    def success_rate(self) -> float | None:
+        total = self.successes + self.failures
+        return round(self.successes / total * 100, 1) if total else None
+
+    @property
+    def state(self) -> dict:
+        """Values for diagnostic sensors"""
+        return {
+            "connect_time": _round(self.connect.last),
+            "get_latency": _round(self.get.mean),
+            "set_latency": _round(self.set.mean),
+            "success_rate": self.success_rate,
+            "retries": self.retries,
+            "last_success": self.last_success,
+            "source": self.source,
+        }
+
+    def as_dict(self) -> dict:
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "notifications": self.notifications,
+            "success_rate": self.success_rate,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "source": self.source,
+            "histograms": {
+                "connect": self.connect.as_dict(),
+                "get": self.get.as_dict(),
+                "set": self.set.as_dict(),
+                "lock_wait": self.lock_wait.as_dict(),
+            },
+        }
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 3) if value is not None else None
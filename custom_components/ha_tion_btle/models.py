@@ -0,0 +1,108 @@
+"""Capabilities of supported breezer models"""
+from __future__ import annotations
+
+import functools
+import importlib
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from homeassistant.components import bluetooth
+from homeassistant.core import HomeAssistant
+
+if TYPE_CHECKING:
+    from bleak.backends.device import BLEDevice
+    from tion_btle.tion import Tion
+
+_LOGGER = logging.getLogger(__name__)
+
+# model of breezers that were configured before model was asked
+DEFAULT_MODEL = "S3"
+
+FEATURE_HEATER = "heater"
+
+
+@dataclass(frozen=True)
+class TionModel:
+    """What breezer model can do and which tion_btle driver talks to it"""
+    name: str
+    # module and class of tion_btle driver; module is imported with first breezer of the model
+    driver_module: str
+    driver_class: str
+    air_sources: tuple[str, ...]
+    speed_count: int
+    # nominal airflow (m³/h) for fan speeds from 1, from manufacturer specifications
+    airflow: tuple[int, ...]
+    features: frozenset[str]
+
+
+MODELS: dict[str, TionModel] = {
+    model.name: model for model in (
+        TionModel(
+            name="S3",
+            driver_module="tion_btle.s3",
+            driver_class="TionS3",
+            air_sources=("outside", "mixed", "recirculation"),
+            speed_count=6,
+            airflow=(25, 45, 60, 90, 120, 150),
+            features=frozenset({FEATURE_HEATER}),
+        ),
+        TionModel(
+            name="S4",
+            driver_module="tion_btle.s4",
+            driver_class="TionS4",
+            air_sources=("outside", "recirculation"),
+            speed_count=6,
+            airflow=(25, 45, 70, 100, 135, 180),
+            features=frozenset({FEATURE_HEATER}),
+        ),
+        TionModel(
+            name="Lite",
+            driver_module="tion_btle.lite",
+            driver_class="TionLite",
+            air_sources=("outside", "recirculation"),
+            speed_count=6,
+            airflow=(25, 40, 60, 80, 100, 120),
+            features=frozenset({FEATURE_HEATER}),
+        ),
+    )
+}
+
+
+def get_model(model: str) -> TionModel:
+    try:
+        return MODELS[model]
+    except KeyError:
+        raise NotImplementedError("Model '%s' is not supported!" % model) from None
+
+
+@functools.cache
+def driver_class(model: str) -> type[Tion]:
+    """Import driver of model. May block on the first call, so async code should call it via import executor."""
+    info = get_model(model)
+    return getattr(importlib.import_module(info.driver_module), info.driver_class)
+
+
+async def async_load_driver(hass: HomeAssistant, model: str) -> None:
+    """Import driver of model without blocking event loop"""
+    await hass.async_add_import_executor_job(driver_class, model)
+
+
+def create_driver(model: str, device: str | BLEDevice) -> Tion:
+    """Driver for breezer; it may be created with MAC only and will get BLEDevice with first advertisement"""
+    return driver_class(model)(device)
+
+
+async def async_create_connectable_driver(hass: HomeAssistant, model: str, mac: str) -> Tion:
+    """Driver for breezer that is heard by connectable scanner right now
+
+    :raises BleakError: breezer is not seen
+    """
+    from bleak.exc import BleakError  # pylint: disable=import-outside-toplevel
+
+    await async_load_driver(hass, model)
+    btle_device = bluetooth.async_ble_device_from_address(hass, mac, connectable=True)
+    if btle_device is None:
+        _LOGGER.warning("Could not find device with mac=%s", mac)
+        raise BleakError("Could not find device with mac=%s" % mac)
+    return create_driver(model, btle_device)
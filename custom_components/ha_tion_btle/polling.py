@@ -0,0 +1,51 @@
+"""Adaptive polling interval for Tion breezers"""
+from __future__ import annotations
+
+import datetime
+import time
+
+
+class AdaptivePolling:
+    """Poll interval that is short after changes and grows while breezer state is stable.
+
+    After command or detected state change breezer is polled every `min_interval` seconds for `fast_period` seconds.
+    Then interval starts from `base_interval` and is multiplied by `factor` after every poll without changes, but
+    never exceeds `max_interval`.
+    """
+
+    def __init__(self, min_interval: int, base_interval: int, max_interval: int, fast_period: int,
+                 factor: float = 1.5):
+        self._min_interval: int = min_interval
+        self._max_interval: int = max(max_interval, min_interval)
+        self._base_interval: int = min(max(base_interval, min_interval), self._max_interval)
+        self._fast_period: int = fast_period
+        self._factor: float = factor
+        self._fast_until: float = 0.0
+        self._interval: float = self._base_interval
+
+    @property
+    def interval(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self._interval)
+
+    @property
+    def is_fast(self) -> bool:
+        return time.monotonic() < self._fast_until
+
+    def activity(self) -> None:
+        """Command was sent or state was changed: poll fast for a while."""
+        self._fast_until = time.monotonic() + self._fast_period
+        self._interval = self._min_interval
+
+    def polled(self, changed: bool) -> None:
+        """Calculate next interval after successful poll.
+
+        :param changed: was breezer state changed since previous poll
+        """
+        if changed:
+            self.activity()
+        elif self.is_fast:
+            self._interval = self._min_interval
+        elif self._interval < self._base_interval:
+            self._interval = self._base_interval
+        else:
+            self._interval = min(self._interval * self._factor, self._max_interval)
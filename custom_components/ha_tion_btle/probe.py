@@ -0,0 +1,138 @@
+"""Validation of breezer while adding it and handing its connection over to integration"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from homeassistant.components.bluetooth import BluetoothServiceInfoBleak
+from homeassistant.core import HomeAssistant, callback, CALLBACK_TYPE
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, PROBES, PROBE_HANDOFF_TIMEOUT, PROBE_READY_INTERVAL, PROBE_TIMEOUT
+from .scheduler import async_get_scheduler
+
+if TYPE_CHECKING:
+    from tion_btle.tion import Tion
+
+_LOGGER = logging.getLogger(__name__)
+
+# service advertised by S3. S4 and Lite advertise the same service, so they are recognized by name only.
+S3_SERVICE_UUID = "6e400001-b5a3-f393-e0a9-e50e24dcca9e"
+
+
+def model_from_advertisement(service_info: BluetoothServiceInfoBleak) -> str | None:
+    """Guess breezer model by advertisement.
+
+    :return: model or None if it is not clear
+    """
+    name = (service_info.name or "").lower()
+    if "lite" in name:
+        return "Lite"
+    if "4s" in name:
+        return "S4"
+    if "3s" in name or S3_SERVICE_UUID in service_info.service_uuids:
+        return "S3"
+    return None
+
+
+@dataclass
+class ProbedBreezer:
+    """Connected breezer and its state got while adding it"""
+    tion: Tion
+    data: dict
+    cancel_expiration: CALLBACK_TYPE | None = None
+
+
+async def async_probe(tion: Tion, pair: bool) -> dict:
+    """Pair (if needed) and get first state from breezer. Connection is kept open on success.
+
+    :raises TimeoutError: breezer was not ready in PROBE_TIMEOUT seconds
+    :return: state of breezer
+    """
+    connected = False
+    try:
+        async with asyncio.timeout(PROBE_TIMEOUT):
+            if pair:
+                await tion.pair()
+
+            # breezer drops connections for a while after pairing, so try until it accepts one
+            while not connected:
+                try:
+                    await tion.connect()
+                    connected = True
+                except Exception as e:
+                    _LOGGER.debug("Breezer is not ready yet (%s: %s)", type(e).__name__, e)
+                    await tion.disconnect()
+                    await asyncio.sleep(PROBE_READY_INTERVAL)
+
+            return await tion.get()
+    except BaseException:
+        if connected:
+            await tion.disconnect()
+        raise
+
+
+@callback
+def async_store_probe(hass: HomeAssistant, mac: str, tion: Tion, data: dict, adapter: str) -> None:
+    """Keep connected breezer for config entry that is going to be created.
+
+    Must be called while holding slot of adapter that was used for probe: kept connection holds this slot (and config
+    entry takes it over with connection), so probes of many breezers don't exceed connection limit of adapter.
+    Connection is closed if nobody takes breezer in PROBE_HANDOFF_TIMEOUT seconds or if the slot is needed by others.
+    """
+    probes: dict[str, ProbedBreezer] = hass.data.setdefault(DOMAIN, {}).setdefault(PROBES, {})
+    previous = probes.pop(mac, None)
+    if previous is not None:
+        # new probe inherits slot of the previous one
+        _async_release(hass, mac, previous, free_slot=False)
+
+    probe = ProbedBreezer(tion, data)
+
+    @callback
+    def _close():
+        if probes.get(mac) is probe:
+            del probes[mac]
+            _async_release(hass, mac, probe)
+
+    @callback
+    def _expire(_now):
+        probe.cancel_expiration = None
+        if probes.get(mac) is probe:
+            _LOGGER.debug("Nobody took connection to %s, closing it", mac)
+            _close()
+
+    if not async_get_scheduler(hass).connection_kept(adapter, mac, _close):
+        # slot is needed by other breezers: config entry will get state by itself
+        _LOGGER.debug("Closing connection to %s after probe: slot of %s is needed", mac, adapter)
+        _async_release(hass, mac, probe)
+        return
+    probes[mac] = probe
+    probe.cancel_expiration = async_call_later(hass, PROBE_HANDOFF_TIMEOUT, _expire)
+
+
+@callback
+def async_take_probe(hass: HomeAssistant, mac: str) -> ProbedBreezer | None:
+    """Connected breezer and its state if breezer was probed recently. Caller is responsible for disconnecting."""
+    probe: ProbedBreezer | None = hass.data.get(DOMAIN, {}).get(PROBES, {}).pop(mac, None)
+    if probe is not None and probe.cancel_expiration is not None:
+        probe.cancel_expiration()
+        probe.cancel_expiration = None
+    return probe
+
+
+@callback
+def _async_release(hass: HomeAssistant, mac: str, probe: ProbedBreezer, free_slot: bool = True) -> None:
+    if probe.cancel_expiration is not None:
+        probe.cancel_expiration()
+        probe.cancel_expiration = None
+
+    async def _async_disconnect():
+        try:
+            await probe.tion.disconnect()
+        finally:
+            if free_slot:
+                async_get_scheduler(hass).connection_closed(mac)
+
+    hass.async_create_task(_async_disconnect())
@@ -0,0 +1,75 @@
+"""State frames that breezer sends without request (after changes by remote or vendor app)
+
+tion_btle has no public interface for notifications, so this module relies on internals of the driver version that is
+pinned in manifest: notification handler (`_delegation`) and frame decoding (`_collect_message`, `_decode_response`).
+Push updates are not installed if driver doesn't have them, and breezer is polled as usual.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+
+from tion_btle.tion import Tion, TionDelegation
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PushDelegation(TionDelegation):
+    """Notification handler of tion_btle driver that passes unsolicited frames to listener.
+
+    Frames received while driver may wait for response are queued for the driver as usual.
+    """
+
+    def __init__(self, is_waiting: Callable[[], bool], listener: Callable[[bytearray], None]):
+        super().__init__()
+        self._is_waiting = is_waiting
+        self._listener = listener
+
+    def handleNotification(self, handle: int, data: bytearray):
+        if self._is_waiting():
+            super().handleNotification(handle, data)
+        else:
+            self._listener(data)
+
+
+def supported(tion: Tion) -> bool:
+    """Driver has internals that push updates rely on"""
+    return isinstance(getattr(tion, "_delegation", None), TionDelegation) and \
+        callable(getattr(tion, "_collect_message", None)) and callable(getattr(tion, "_decode_response", None))
+
+
+def install(tion: Tion, is_waiting: Callable[[], bool], listener: Callable[[bytearray], None]) -> bool:
+    """Replace notification handler of driver. Must be done while disconnected: handler is bound on connect.
+
+    :return: handler is installed
+    """
+    if installed(tion):
+        return True
+    if not supported(tion):
+        _LOGGER.warning("Driver of %s doesn't support push updates, breezer will be polled", tion.mac)
+        return False
+    tion._delegation = PushDelegation(is_waiting, listener)
+    return True
+
+
+def installed(tion: Tion) -> bool:
+    return isinstance(getattr(tion, "_delegation", None), PushDelegation)
+
+
+def decode_frame(tion: Tion, frame: bytearray) -> bool:
+    """Feed frame to driver as part of state response.
+
+    Must be called while no operation uses driver: decoded state replaces the one that driver keeps.
+
+    :return: full state was collected and decoded, so driver's get(skip_update=True) returns it without communication
+    """
+    try:
+        if not tion._collect_message(frame):
+            return False
+        tion._decode_response(tion._data)
+    except Exception as e:
+        _LOGGER.debug("Could not decode notification %s from %s: %s", bytes(frame).hex(), tion.mac, e)
+        return False
+
+    tion.have_breezer_state = True
+    return True
@@ -0,0 +1,212 @@
+"""Shared scheduler for operations with Tion breezers"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, SCHEDULER, SCHEDULER_MAX_CONCURRENT, SCHEDULER_POLL_STAGGER
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_WRITE = 0
+PRIORITY_POLL = 1
+
+
+class _AdapterQueue:
+    """Slots and waiting operations for one bluetooth adapter or proxy"""
+
+    def __init__(self):
+        # slots taken by operations and by connections that are kept open between them
+        self.running: int = 0
+        # devices with running operation
+        self.active: set[str] = set()
+        # devices with kept connection (the oldest first) and callbacks that close them
+        self.kept: dict[str, Callable[[], None]] = {}
+        # kept connections that were asked to close; their slots are taken until they are closed
+        self.closing: set[str] = set()
+        self.waiting: list[tuple[int, int, int, str, asyncio.Future]] = []
+        self.queued_by_device: dict[str, int] = {}
+        self.next_poll_at: float = 0.0
+        self.max_queue_depth: int = 0
+        self.waits: int = 0
+        self.wait_total: float = 0.0
+        self.wait_max: float = 0.0
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "running": self.running,
+            "kept_connections": len(self.kept) + len(self.closing),
+            "queue_depth": len(self.waiting),
+            "max_queue_depth": self.max_queue_depth,
+            "waits": self.waits,
+            "wait_total": self.wait_total,
+            "wait_max": self.wait_max,
+        }
+
+
+class TionScheduler:
+    """Limits number of simultaneous operations with breezers for every bluetooth adapter (or proxy).
+
+    Waiting operations are ordered by priority (writes go before polls) and then fairly between devices: operation of
+    device with fewer queued operations goes first. Polls via the same adapter start at least `poll_stagger` seconds
+    apart, so breezers that were set up at the same moment spread their poll phases.
+
+    Connection that is kept open after operation keeps its slot: slots are connections of adapter. When operation has
+    to wait, the oldest kept connection is asked to close.
+    """
+
+    def __init__(self, max_concurrent: int, poll_stagger: float):
+        self._max_concurrent: int = max_concurrent
+        self._poll_stagger: float = poll_stagger
+        self._adapters: dict[str, _AdapterQueue] = {}
+        self._sequence = itertools.count()
+
+    def _adapter(self, adapter: str) -> _AdapterQueue:
+        try:
+            return self._adapters[adapter]
+        except KeyError:
+            self._adapters[adapter] = _AdapterQueue()
+            return self._adapters[adapter]
+
+    async def async_wait_poll_turn(self, adapter: str) -> None:
+        """Wait until poll via adapter may be started without colliding with polls of other breezers."""
+        queue = self._adapter(adapter)
+        now = time.monotonic()
+        start = max(now, queue.next_poll_at)
+        queue.next_poll_at = start + self._poll_stagger
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    @asynccontextmanager
+    async def async_slot(self, adapter: str, device: str, priority: int):
+        """Run operation with device while holding one of adapter's slots."""
+        queue = self._adapter(adapter)
+        enqueued = time.monotonic()
+
+        if device in queue.kept or device in queue.closing:
+            # operation uses slot of connection that is open already
+            queue.kept.pop(device, None)
+            queue.closing.discard(device)
+        elif queue.running < self._max_concurrent and not queue.waiting:
+            queue.running += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            rank = queue.queued_by_device.get(device, 0)
+            queue.queued_by_device[device] = rank + 1
+            entry = (priority, rank, next(self._sequence), device, waiter)
+            heapq.heappush(queue.waiting, entry)
+            queue.max_queue_depth = max(queue.max_queue_depth, len(queue.waiting))
+            self._close_kept(queue)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # slot was granted right before cancellation
+                    self._release(queue)
+                else:
+                    waiter.cancel()
+                    self._remove_waiting(queue, entry)
+                raise
+
+        wait = time.monotonic() - enqueued
+        queue.waits += 1
+        queue.wait_total += wait
+        queue.wait_max = max(queue.wait_max, wait)
+        _LOGGER.debug("%s got slot of %s after %.3fs", device, adapter, wait)
+
+        queue.active.add(device)
+        try:
+            yield
+        finally:
+            queue.active.discard(device)
+            if device not in queue.kept:
+                self._release(queue)
+
+    def connection_kept(self, adapter: str, device: str, close: Callable[[], None]) -> bool:
+        """Connection of device stays open after operation and keeps slot of adapter.
+
+        :param close: callback that closes connection; `connection_closed` must be called when it is closed
+        :return: False if slot is needed by waiting operations or there is no free one: connection should be closed
+        """
+        queue = self._adapter(adapter)
+        if queue.waiting or device in queue.closing:
+            return False
+        if device not in queue.kept and device not in queue.active:
+            # connection was opened without operation slot (while breezer was added)
+            if queue.running >= self._max_concurrent:
+                return False
+            queue.running += 1
+        queue.kept.pop(device, None)
+        queue.kept[device] = close
+        return True
+
+    def connection_closed(self, device: str) -> None:
+        """Kept connection of device is closed, its slot is free"""
+        for queue in self._adapters.values():
+            if device in queue.kept or device in queue.closing:
+                queue.kept.pop(device, None)
+                queue.closing.discard(device)
+                self._release(queue)
+
+    @staticmethod
+    def _close_kept(queue: _AdapterQueue) -> None:
+        """Ask the oldest kept connection to close, if waiting operations are not covered by closing ones yet"""
+        if queue.kept and len(queue.closing) < len(queue.waiting):
+            device = next(iter(queue.kept))
+            close = queue.kept.pop(device)
+            queue.closing.add(device)
+            _LOGGER.debug("Closing kept connection of %s: its slot is needed", device)
+            close()
+
+    @staticmethod
+    def _dequeued(queue: _AdapterQueue, device: str) -> None:
+        queue.queued_by_device[device] -= 1
+        if queue.queued_by_device[device] <= 0:
+            del queue.queued_by_device[device]
+
+    @classmethod
+    def _remove_waiting(cls, queue: _AdapterQueue, entry: tuple) -> None:
+        """Cancelled operation leaves queue right away, so it isn't counted in queue depth and fairness"""
+        try:
+            queue.waiting.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(queue.waiting)
+        cls._dequeued(queue, entry[3])
+
+    @classmethod
+    def _release(cls, queue: _AdapterQueue) -> None:
+        queue.running -= 1
+        while queue.waiting:
+            _priority, _rank, _sequence, device, waiter = heapq.heappop(queue.waiting)
+            cls._dequeued(queue, device)
+            # cancelled waiters are removed when cancelled, done ones are skipped anyway
+            if not waiter.done():
+                queue.running += 1
+                waiter.set_result(None)
+                break
+
+    @property
+    def stats(self) -> dict[str, dict[str, int | float]]:
+        """Queue depth and wait time statistics for every adapter"""
+        return {adapter: queue.stats for adapter, queue in self._adapters.items()}
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> TionScheduler:
+    """Scheduler shared by all breezers"""
+    data = hass.data.setdefault(DOMAIN, {})
+    if SCHEDULER not in data:
+        data[SCHEDULER] = TionScheduler(
+            max_concurrent=SCHEDULER_MAX_CONCURRENT,
+            poll_stagger=SCHEDULER_POLL_STAGGER,
+        )
+    return data[SCHEDULER]
@@ -43,6 +43,8 @@ class TionInputSelect(SelectEntity, CoordinatorEntity):
         self.hass = hass
 
         self.entity_description = description
+        # coordinator keys that are used by entity
+        self._tion_keys = frozenset([description.key])
         self._attr_name = f"{instance.name} {description.name}"
         self._attr_device_info = instance.device_info
         self._attr_unique_id = f"{instance.unique_id}-{description.key}"
@@ -54,8 +56,12 @@ class TionInputSelect(SelectEntity, CoordinatorEntity):
         self._attr_current_option = self.coordinator.data.get(self.entity_description.key)
 
     def _handle_coordinator_update(self) -> None:
+        if not self.coordinator.has_changes(self._tion_keys) and \
+                self._attr_assumed_state == self.coordinator.assumed_state:
+            return
+
         self._attr_current_option = self.coordinator.data.get(self.entity_description.key)
-        self._attr_assumed_state = False if self.coordinator.last_update_success else True
+        self._attr_assumed_state = self.coordinator.assumed_state
         self.async_write_ha_state()
 
     @property
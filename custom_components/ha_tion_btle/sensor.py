@@ -1,14 +1,21 @@
 """
 Sensors for Tion breezers
 """
+from __future__ import annotations
+
 import logging
+import time
+from dataclasses import dataclass
 from datetime import timedelta
 
 from homeassistant.components.sensor import SensorEntityDescription, SensorDeviceClass, SensorStateClass, SensorEntity
-from homeassistant.const import UnitOfTemperature
+from homeassistant.const import (
+    PERCENTAGE, UnitOfEnergy, UnitOfPower, UnitOfTemperature, UnitOfTime, UnitOfVolume, UnitOfVolumeFlowRate,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import TionInstance
@@ -18,8 +25,25 @@ _LOGGER = logging.getLogger(__name__)
 
 SCAN_INTERVAL = timedelta(seconds=30)
 
-SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
-    SensorEntityDescription(
+
+@dataclass(frozen=True, kw_only=True)
+class TionSensorEntityDescription(SensorEntityDescription):
+    """Sensor description with limits for publishing noisy values.
+
+    Changes smaller than `deadband` (in units of value) are held back: value is published `min_publish_interval`
+    later if it still differs from published one, so flicker is hidden while lasting change is recorded. Temperatures
+    are reported in whole degrees, so deadband 1 holds back only changes of values with finer resolution. Changes are
+    published not more often than once per `min_publish_interval`; last value is published when interval is over, so
+    recorded history (and long-term statistics) always ends with actual value. Value is published at least once per
+    `heartbeat`.
+    """
+    deadband: float = 0
+    min_publish_interval: timedelta | None = None
+    heartbeat: timedelta | None = None
+
+
+SENSOR_TYPES: tuple[TionSensorEntityDescription, ...] = (
+    TionSensorEntityDescription(
         key="in_temp",
         name="input temperature",
         native_unit_of_measurement=UnitOfTemperature.CELSIUS,
@@ -27,8 +51,11 @@ SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
         state_class=SensorStateClass.MEASUREMENT,
         entity_registry_enabled_default=True,
         icon="mdi:import",
+        deadband=1,
+        min_publish_interval=timedelta(minutes=1),
+        heartbeat=timedelta(minutes=15),
     ),
-    SensorEntityDescription(
+    TionSensorEntityDescription(
         key="out_temp",
         name="output temperature",
         native_unit_of_measurement=UnitOfTemperature.CELSIUS,
@@ -36,28 +63,154 @@ SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
         state_class=SensorStateClass.MEASUREMENT,
         entity_registry_enabled_default=True,
         icon="mdi:export",
+        deadband=1,
+        min_publish_interval=timedelta(minutes=1),
+        heartbeat=timedelta(minutes=15),
     ),
-    SensorEntityDescription(
+    TionSensorEntityDescription(
         key="filter_remain",
         name="filters remain",
         entity_registry_enabled_default=True,
         entity_category=EntityCategory.DIAGNOSTIC,
     ),
 
-    SensorEntityDescription(
+    TionSensorEntityDescription(
         key="fan_speed",
         name="current fan speed",
         entity_registry_enabled_default=True,
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:fan",
     ),
-    SensorEntityDescription(
+    TionSensorEntityDescription(
         key="rssi",
         name="rssi",
         entity_registry_enabled_default=False,
         state_class=SensorStateClass.MEASUREMENT,
         entity_category=EntityCategory.DIAGNOSTIC,
         icon="mdi:access-point",
+        deadband=5,
+        min_publish_interval=timedelta(minutes=5),
+        heartbeat=timedelta(minutes=30),
+    ),
+)
+
+# values that are computed from breezer state by TionInstance (see derived.py)
+DERIVED_SENSOR_TYPES: tuple[TionSensorEntityDescription, ...] = (
+    TionSensorEntityDescription(
+        key="airflow",
+        name="airflow",
+        native_unit_of_measurement=UnitOfVolumeFlowRate.CUBIC_METERS_PER_HOUR,
+        device_class=SensorDeviceClass.VOLUME_FLOW_RATE,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=True,
+        icon="mdi:weather-windy",
+    ),
+    TionSensorEntityDescription(
+        key="air_volume",
+        name="air volume",
+        native_unit_of_measurement=UnitOfVolume.CUBIC_METERS,
+        device_class=SensorDeviceClass.VOLUME,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=True,
+        icon="mdi:weather-windy",
+    ),
+    TionSensorEntityDescription(
+        key="heater_power",
+        name="heater power",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+    ),
+    TionSensorEntityDescription(
+        key="heater_energy",
+        name="heater energy",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=True,
+    ),
+    TionSensorEntityDescription(
+        key="heater_duty_cycle",
+        name="heater duty cycle",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+        icon="mdi:radiator",
+    ),
+    TionSensorEntityDescription(
+        key="filter_wear_rate",
+        name="filter wear rate",
+        native_unit_of_measurement="d/d",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:air-filter",
+    ),
+)
+
+# performance of communication with breezer, values are taken from TionInstance.metrics
+METRIC_SENSOR_TYPES: tuple[TionSensorEntityDescription, ...] = (
+    TionSensorEntityDescription(
+        key="connect_time",
+        name="connect time",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:timer-outline",
+    ),
+    TionSensorEntityDescription(
+        key="get_latency",
+        name="get latency",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:timer-outline",
+    ),
+    TionSensorEntityDescription(
+        key="set_latency",
+        name="set latency",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:timer-outline",
+    ),
+    TionSensorEntityDescription(
+        key="success_rate",
+        name="success rate",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:check-network-outline",
+    ),
+    TionSensorEntityDescription(
+        key="retries",
+        name="retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:restart",
+    ),
+    TionSensorEntityDescription(
+        key="last_success",
+        name="last success",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    TionSensorEntityDescription(
+        key="source",
+        name="connection source",
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:bluetooth-connect",
     ),
 )
 
@@ -71,7 +224,8 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry, async_add_
     """Set up the sensor entry"""
     tion_instance = hass.data[DOMAIN][config.unique_id]
     entities: list[TionSensor] = [
-        TionSensor(description, tion_instance) for description in SENSOR_TYPES]
+        TionSensor(description, tion_instance) for description in SENSOR_TYPES + DERIVED_SENSOR_TYPES]
+    entities.extend(TionMetricSensor(description, tion_instance) for description in METRIC_SENSOR_TYPES)
     async_add_entities(entities)
 
     return True
@@ -80,7 +234,9 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry, async_add_
 class TionSensor(SensorEntity, CoordinatorEntity):
     """Representation of a sensor."""
 
-    def __init__(self, description: SensorEntityDescription, instance: TionInstance):
+    entity_description: TionSensorEntityDescription
+
+    def __init__(self, description: TionSensorEntityDescription, instance: TionInstance):
         """Initialize the sensor."""
 
         CoordinatorEntity.__init__(
@@ -88,10 +244,17 @@ class TionSensor(SensorEntity, CoordinatorEntity):
             coordinator=instance,
         )
         self.entity_description = description
+        # coordinator keys that are used by entity. Fan speed is reported as zero when breezer is off.
+        self._tion_keys = frozenset([description.key, "is_on"] if description.key == "fan_speed" else [description.key])
         self._attr_name = f"{instance.name} {description.name}"
         self._attr_device_info = instance.device_info
         self._attr_unique_id = f"{instance.unique_id}-{description.key}"
 
+        # last published value and when (monotonic) it was published
+        self._published_value = None
+        self._published_at: float = 0.0
+        self._cancel_delayed_publish: CALLBACK_TYPE | None = None
+
         _LOGGER.debug(f"Init of sensor {self.name} ({instance.unique_id})")
 
     @property
@@ -107,10 +270,78 @@ class TionSensor(SensorEntity, CoordinatorEntity):
         return value
 
     def _handle_coordinator_update(self) -> None:
-        self._attr_assumed_state = False if self.coordinator.last_update_success else True
+        if self._attr_assumed_state != self.coordinator.assumed_state:
+            # confirmation of state is always shown immediately
+            self._publish()
+            return
+
+        if self._cancel_delayed_publish is not None:
+            # newest value will be published when minimal interval is over
+            return
+        if not self.coordinator.has_changes(self._tion_keys) and self.native_value == self._published_value:
+            return
+
+        now = time.monotonic()
+        description = self.entity_description
+        if description.heartbeat is None or now - self._published_at < description.heartbeat.total_seconds():
+            if self._within_deadband(self.native_value):
+                if description.min_publish_interval is not None:
+                    self._cancel_delayed_publish = async_call_later(
+                        self.hass, description.min_publish_interval, self._delayed_publish)
+                return
+
+            if description.min_publish_interval is not None:
+                delay = self._published_at + description.min_publish_interval.total_seconds() - now
+                if delay > 0:
+                    self._cancel_delayed_publish = async_call_later(self.hass, delay, self._delayed_publish)
+                    return
+
+        self._publish()
+
+    def _within_deadband(self, value) -> bool:
+        """Value differs from published one by less than deadband"""
+        published = self._published_value
+        if not self.entity_description.deadband or not isinstance(value, (int, float)) or \
+                not isinstance(published, (int, float)):
+            return False
+        return abs(value - published) < self.entity_description.deadband
+
+    @callback
+    def _delayed_publish(self, _now) -> None:
+        self._cancel_delayed_publish = None
+        if self._published_value != self.native_value:
+            self._publish()
+
+    def _publish(self) -> None:
+        if self._cancel_delayed_publish is not None:
+            self._cancel_delayed_publish()
+            self._cancel_delayed_publish = None
+
+        self._attr_assumed_state = self.coordinator.assumed_state
+        self._published_value = self.native_value
+        self._published_at = time.monotonic()
         self.async_write_ha_state()
 
+    async def async_will_remove_from_hass(self) -> None:
+        if self._cancel_delayed_publish is not None:
+            self._cancel_delayed_publish()
+            self._cancel_delayed_publish = None
+        await super().async_will_remove_from_hass()
+
     @property
     def available(self) -> bool:
         """Return if entity is available."""
         return True
+
+
+class TionMetricSensor(TionSensor):
+    """Performance of communication with breezer"""
+
+    @property
+    def native_value(self):
+        return self.coordinator.metrics.state.get(self.entity_description.key)
+
+    def _handle_coordinator_update(self) -> None:
+        # metrics are changed by every operation
+        self._attr_assumed_state = False
+        self.async_write_ha_state()
@@ -0,0 +1,362 @@
+"""Services of Tion integration that are not bound to one entity"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+
+from homeassistant.components import bluetooth
+from homeassistant.config_entries import SOURCE_IMPORT
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+
+from .const import CONF_MAC, DEFAULT_NAME, DOMAIN, SNAPSHOTS, SUPPORTED_DEVICES
+from .models import async_create_connectable_driver
+from .probe import async_probe, async_store_probe
+from .scheduler import PRIORITY_WRITE, async_get_scheduler
+from .tracing import async_get_tracer
+
+if TYPE_CHECKING:
+    from . import TionInstance
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_PROVISION = "provision"
+SERVICE_SET_MANY = "set_many"
+SERVICE_SNAPSHOT = "snapshot"
+SERVICE_RESTORE = "restore"
+SERVICE_TRACE = "trace"
+
+RESULT_ADDED = "added"
+RESULT_ALREADY_CONFIGURED = "already_configured"
+RESULT_FAILED = "failed"
+RESULT_OK = "ok"
+RESULT_UNCHANGED = "unchanged"
+RESULT_NOT_LOADED = "not_loaded"
+
+# state parameters that may be changed by set_many
+SET_MANY_FIELDS = ("is_on", "fan_speed", "heater", "heater_temp", "mode")
+
+
+def normalize_mac(mac: str) -> str:
+    """MAC as services compare it: entries may keep it in any case (manual entry, old imports)"""
+    return mac.upper()
+
+
+PROVISION_SCHEMA = vol.Schema({
+    vol.Required("devices"): vol.All(cv.ensure_list, [vol.Schema({
+        vol.Required(CONF_MAC): vol.All(cv.string, normalize_mac),
+        vol.Required("model"): vol.In(SUPPORTED_DEVICES),
+        vol.Optional("name"): cv.string,
+        vol.Optional("pair", default=False): cv.boolean,
+    })]),
+})
+
+STATE_FIELDS = {
+    vol.Optional("is_on"): cv.boolean,
+    vol.Optional("fan_speed"): vol.All(vol.Coerce(int), vol.Range(min=0, max=6)),
+    vol.Optional("heater"): cv.boolean,
+    vol.Optional("heater_temp"): vol.All(vol.Coerce(int), vol.Range(min=0, max=30)),
+    vol.Optional("mode"): vol.In(["outside", "recirculation", "mixed"]),
+}
+
+MAX_CONCURRENT = vol.All(vol.Coerce(int), vol.Range(min=1))
+
+SET_MANY_SCHEMA = vol.All(
+    cv.make_entity_service_schema({
+        **STATE_FIELDS,
+        vol.Optional("max_concurrent"): MAX_CONCURRENT,
+    }),
+    cv.has_at_least_one_key(*SET_MANY_FIELDS),
+)
+
+SNAPSHOT_SCHEMA = cv.make_entity_service_schema({
+    vol.Optional("name", default="default"): cv.string,
+})
+
+RESTORE_SCHEMA = vol.Schema({
+    vol.Optional("name", default="default"): cv.string,
+    # snapshot returned by snapshot service earlier, instead of stored one
+    vol.Optional("devices"): {vol.All(cv.string, normalize_mac): vol.Schema(STATE_FIELDS, extra=vol.REMOVE_EXTRA)},
+    vol.Optional("max_concurrent"): MAX_CONCURRENT,
+})
+
+
+# target is optional: without it settings and dump are for all breezers
+TRACE_SCHEMA = vol.Schema({
+    **cv.ENTITY_SERVICE_FIELDS,
+    # tracing of targeted breezers
+    vol.Optional("enabled"): cv.boolean,
+    vol.Optional("sample_rate"): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+    vol.Optional("clear", default=False): cv.boolean,
+})
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROVISION,
+        partial(async_provision, hass),
+        schema=PROVISION_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_MANY,
+        partial(async_set_many, hass),
+        schema=SET_MANY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SNAPSHOT,
+        partial(async_snapshot, hass),
+        schema=SNAPSHOT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RESTORE,
+        partial(async_restore, hass),
+        schema=RESTORE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_TRACE,
+        partial(async_trace, hass),
+        schema=TRACE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+async def async_provision(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Pair (if asked), validate and add breezers.
+
+    Breezers are probed concurrently, but not more than scheduler allows for every bluetooth adapter. Config entries
+    are created for breezers that responded, so they start with connection and state got by probe.
+    """
+    started = time.monotonic()
+    devices = call.data["devices"]
+    _LOGGER.info("Provisioning %d breezers", len(devices))
+    results = await asyncio.gather(*(_async_provision_device(hass, d) for d in devices))
+
+    return {
+        "devices": list(results),
+        "added": sum(1 for r in results if r["result"] == RESULT_ADDED),
+        "failed": sum(1 for r in results if r["result"] == RESULT_FAILED),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+
+async def _async_provision_device(hass: HomeAssistant, device: dict) -> dict:
+    mac = device[CONF_MAC]
+    result = {CONF_MAC: mac, "result": RESULT_FAILED, "error": None, "wait": None, "probe": None, "seconds": 0.0}
+    started = time.monotonic()
+
+    if any(normalize_mac(e.unique_id or "") == mac for e in hass.config_entries.async_entries(DOMAIN)):
+        result["result"] = RESULT_ALREADY_CONFIGURED
+        return result
+
+    service_info = bluetooth.async_last_service_info(hass, mac, connectable=True)
+    adapter = service_info.source if service_info is not None else "default"
+    data = {
+        CONF_MAC: mac,
+        "model": device["model"],
+        "name": device.get("name") or (service_info.name if service_info is not None else None) or DEFAULT_NAME,
+        "pair": device["pair"],
+    }
+
+    try:
+        async with async_get_scheduler(hass).async_slot(adapter, mac, PRIORITY_WRITE):
+            result["wait"] = round(time.monotonic() - started, 3)
+            tion = await async_create_connectable_driver(hass, data["model"], mac)
+            state = await async_probe(tion, data["pair"])
+            result["probe"] = round(time.monotonic() - started - result["wait"], 3)
+            # kept connection holds the slot until config entry takes it over
+            async_store_probe(hass, mac, tion, state, adapter)
+
+        flow = await hass.config_entries.flow.async_init(DOMAIN, context={"source": SOURCE_IMPORT}, data=data)
+        if flow["type"] == "abort":
+            result["result"] = flow["reason"]
+        else:
+            result["result"] = RESULT_ADDED
+    except Exception as e:
+        _LOGGER.warning("Could not add %s: %s: %s", mac, type(e).__name__, e)
+        result["error"] = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+    result["seconds"] = round(time.monotonic() - started, 3)
+    _LOGGER.debug("Provisioning of %s: %s", mac, result)
+    return result
+
+
+@callback
+def _async_targeted_instances(hass: HomeAssistant, call: ServiceCall) -> list[TionInstance]:
+    """Breezers that own targeted entities (directly or via devices and areas)"""
+    selected = async_extract_referenced_entity_ids(hass, call)
+    registry = er.async_get(hass)
+    instances: dict[str, TionInstance] = {}
+    for entity_id in selected.referenced | selected.indirectly_referenced:
+        entry = registry.async_get(entity_id)
+        if entry is None or entry.platform != DOMAIN or entry.config_entry_id is None:
+            continue
+        config_entry = hass.config_entries.async_get_entry(entry.config_entry_id)
+        instance = hass.data.get(DOMAIN, {}).get(config_entry.unique_id) if config_entry is not None else None
+        if instance is not None:
+            instances[normalize_mac(instance.unique_id)] = instance
+    return [instances[mac] for mac in sorted(instances)]
+
+
+@callback
+def _async_loaded_instances(hass: HomeAssistant) -> dict[str, TionInstance]:
+    """Loaded breezers by normalized MAC"""
+    data = hass.data.get(DOMAIN, {})
+    return {
+        normalize_mac(entry.unique_id): data[entry.unique_id]
+        for entry in hass.config_entries.async_entries(DOMAIN) if entry.unique_id in data
+    }
+
+
+async def async_set_many(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Change state of many breezers at once.
+
+    Writes go in parallel. Number of simultaneous connections per adapter is limited by shared scheduler and, if
+    max_concurrent is set, by this call.
+    """
+    started = time.monotonic()
+    request = {k: call.data[k] for k in SET_MANY_FIELDS if k in call.data}
+    instances = _async_targeted_instances(hass, call)
+    _LOGGER.info("Setting %s for %d breezers", request, len(instances))
+
+    limits = _adapter_limits(instances, call.data.get("max_concurrent"))
+    results = await asyncio.gather(*(_async_set_device(i, request, limits.get(i.adapter)) for i in instances))
+
+    latencies = [r["seconds"] for r in results if r["result"] == RESULT_OK]
+    return {
+        "devices": list(results),
+        "succeeded": len(latencies),
+        "failed": len(results) - len(latencies),
+        "max_latency": max(latencies, default=None),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+
+async def _async_set_device(instance: TionInstance, request: dict, limit: asyncio.Semaphore | None) -> dict:
+    result = {CONF_MAC: instance.unique_id, "name": instance.name, "result": RESULT_FAILED, "error": None,
+              "seconds": 0.0}
+    started = time.monotonic()
+
+    if "mode" in request and request["mode"] not in instance.supported_air_sources:
+        result["error"] = "Air source %s is not supported by %s" % (request["mode"], instance.model)
+        return result
+
+    try:
+        if limit is not None:
+            async with limit:
+                await instance.set(**request)
+        else:
+            await instance.set(**request)
+        result["result"] = RESULT_OK
+    except Exception as e:
+        _LOGGER.warning("Could not change state of %s: %s: %s", instance.unique_id, type(e).__name__, e)
+        result["error"] = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+    result["seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def _adapter_limits(instances: list[TionInstance], max_concurrent: int | None) -> dict[str, asyncio.Semaphore]:
+    """Limits of simultaneous writes per adapter for one call"""
+    limits: dict[str, asyncio.Semaphore] = {}
+    if max_concurrent is not None:
+        for instance in instances:
+            limits.setdefault(instance.adapter, asyncio.Semaphore(max_concurrent))
+    return limits
+
+
+async def async_snapshot(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Remember state of targeted breezers under given name.
+
+    State is taken from last known data of breezers, nothing is requested from them. Snapshots are kept in memory
+    only, but returned snapshot may be passed to restore service later.
+    """
+    snapshot: dict[str, dict] = {}
+    skipped: list[str] = []
+    for instance in _async_targeted_instances(hass, call):
+        if not all(k in instance.data for k in SET_MANY_FIELDS):
+            skipped.append(normalize_mac(instance.unique_id))
+            continue
+        snapshot[normalize_mac(instance.unique_id)] = {k: instance.data[k] for k in SET_MANY_FIELDS}
+
+    hass.data.setdefault(DOMAIN, {}).setdefault(SNAPSHOTS, {})[call.data["name"]] = snapshot
+    _LOGGER.info("Snapshot %s of %d breezers is taken, state of %s is not known yet", call.data["name"],
+                 len(snapshot), skipped)
+    return {"name": call.data["name"], "devices": snapshot, "skipped": skipped}
+
+
+async def async_restore(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Bring breezers back to snapshot state.
+
+    Every breezer gets one write with parameters that differ from its last known state; breezers that match snapshot
+    are not touched. Writes go in parallel like in set_many.
+    """
+    started = time.monotonic()
+    if "devices" in call.data:
+        snapshot = call.data["devices"]
+    else:
+        try:
+            snapshot = hass.data[DOMAIN][SNAPSHOTS][call.data["name"]]
+        except KeyError:
+            raise HomeAssistantError("Snapshot %s was not taken" % call.data["name"])
+
+    instances = _async_loaded_instances(hass)
+    loaded: dict[str, TionInstance] = {mac: instances[mac] for mac in snapshot if mac in instances}
+    limits = _adapter_limits(list(loaded.values()), call.data.get("max_concurrent"))
+
+    async def restore(mac: str, state: dict) -> dict:
+        instance = loaded.get(mac)
+        if instance is None:
+            return {CONF_MAC: mac, "name": None, "result": RESULT_NOT_LOADED, "error": None, "seconds": 0.0}
+        changes = {k: v for k, v in state.items() if instance.data.get(k) != v}
+        if not changes:
+            return {CONF_MAC: mac, "name": instance.name, "result": RESULT_UNCHANGED, "error": None, "seconds": 0.0}
+        return await _async_set_device(instance, changes, limits.get(instance.adapter))
+
+    _LOGGER.info("Restoring %d breezers", len(snapshot))
+    results = await asyncio.gather(*(restore(mac, state) for mac, state in snapshot.items()))
+    return {
+        "devices": list(results),
+        "changed": sum(1 for r in results if r["result"] == RESULT_OK),
+        "unchanged": sum(1 for r in results if r["result"] == RESULT_UNCHANGED),
+        "failed": sum(1 for r in results if r["result"] in (RESULT_FAILED, RESULT_NOT_LOADED)),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+
+async def async_trace(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Change tracing settings and dump collected spans.
+
+    Spans of targeted breezers (or of all breezers without target) are returned, then removed if clear is set.
+    """
+    tracer = async_get_tracer(hass)
+    devices = {i.unique_id for i in _async_targeted_instances(hass, call)}
+
+    if "sample_rate" in call.data:
+        tracer.sample_rate = call.data["sample_rate"]
+    if call.data.get("enabled") is True:
+        tracer.devices |= devices
+    elif call.data.get("enabled") is False:
+        tracer.devices -= devices
+    _LOGGER.info("Tracing settings: %s", tracer.as_dict)
+
+    spans = tracer.dump(devices or None)
+    if call.data["clear"]:
+        tracer.clear(devices or None)
+    return {**tracer.as_dict, "spans": spans}
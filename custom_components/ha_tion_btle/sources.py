@@ -0,0 +1,85 @@
+"""Statistics of bluetooth scanners and proxies that carry connections to breezer"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from tion_btle.tion import Tion
+
+_LOGGER = logging.getLogger(__name__)
+
+# weight of new connection time in its moving average
+LATENCY_SMOOTHING = 0.3
+
+
+def connection_source(driver: Tion) -> str | None:
+    """Scanner or proxy that carries current connection of driver.
+
+    Connection path is chosen by Home Assistant's bleak wrapper (by RSSI and free slots of scanners) when connection is
+    opened, whatever device handle was given to driver. Wrapper reports the scanner of established connection; None is
+    returned if it doesn't.
+    """
+    client = getattr(driver, "_btle", None)
+    scanner = getattr(client, "_connected_scanner", None)
+    return getattr(scanner, "source", None)
+
+
+@dataclass
+class SourceStats:
+    """How breezer is heard and connected via one scanner or proxy"""
+    rssi: int | None = None
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    latency: float | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "rssi": self.rssi,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+        }
+
+
+class SourceStatistics:
+    """Per-breezer statistics of scanners and proxies.
+
+    RSSI is taken from advertisements; connection time and results of operations are counted for the source that
+    really carried the connection, so they are known only when Home Assistant reports it.
+    """
+
+    def __init__(self):
+        self._stats: dict[str, SourceStats] = {}
+
+    def _source(self, source: str) -> SourceStats:
+        try:
+            return self._stats[source]
+        except KeyError:
+            self._stats[source] = SourceStats()
+            return self._stats[source]
+
+    def advertisement(self, source: str, rssi: int | None) -> None:
+        if rssi is not None:
+            self._source(source).rssi = rssi
+
+    def connected(self, source: str, latency: float) -> None:
+        stats = self._source(source)
+        stats.latency = latency if stats.latency is None else \
+            stats.latency + (latency - stats.latency) * LATENCY_SMOOTHING
+
+    def success(self, source: str) -> None:
+        stats = self._source(source)
+        stats.successes += 1
+        stats.consecutive_failures = 0
+
+    def failure(self, source: str) -> None:
+        stats = self._source(source)
+        stats.failures += 1
+        stats.consecutive_failures += 1
+
+    def as_dict(self) -> dict[str, dict]:
+        return {source: stats.as_dict() for source, stats in self._stats.items()}
@@ -0,0 +1,145 @@
+"""Sampled tracing of operations with breezers"""
+from __future__ import annotations
+
+import collections
+import contextlib
+import contextvars
+import itertools
+import logging
+import random
+import time
+from collections.abc import Iterator
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, TRACER, TRACE_RING_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Span:
+    """One traced operation (poll, write, ...) with one breezer.
+
+    Events keep message and arguments; they are formatted only when span is dumped or debug logging is on.
+    """
+
+    def __init__(self, span_id: str, device: str, operation: str, attributes: dict):
+        self.id: str = span_id
+        self.device: str = device
+        self.operation: str = operation
+        self.attributes: dict = attributes
+        self.started: float = time.time()
+        self._started_monotonic: float = time.monotonic()
+        self.duration: float | None = None
+        self.result: str | None = None
+        # (seconds since start of span, message, arguments)
+        self.events: list[tuple[float, str, tuple]] = []
+
+    def event(self, msg: str, *args) -> None:
+        self.events.append((time.monotonic() - self._started_monotonic, msg, args))
+        _LOGGER.debug("[%s] " + msg, self.id, *args)
+
+    def finish(self, result: str) -> None:
+        self.duration = time.monotonic() - self._started_monotonic
+        self.result = result
+        _LOGGER.debug("[%s] %s finished in %.3fs: %s", self.id, self.operation, self.duration, result)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "device": self.device,
+            "operation": self.operation,
+            "attributes": self.attributes,
+            "started": self.started,
+            "duration": round(self.duration, 4) if self.duration is not None else None,
+            "result": self.result,
+            "events": [{"at": round(at, 4), "message": msg % args if args else msg} for at, msg, args in self.events],
+        }
+
+
+class _NoSpan:
+    """Span of operation that is not traced"""
+    id = None
+
+    def event(self, msg: str, *args) -> None:
+        pass
+
+
+NO_SPAN = _NoSpan()
+_current_span: contextvars.ContextVar[Span | _NoSpan] = contextvars.ContextVar("tion_span", default=NO_SPAN)
+
+
+def event(msg: str, *args) -> None:
+    """Add event to span of current operation, if it is traced"""
+    _current_span.get().event(msg, *args)
+
+
+class Tracer:
+    """Spans of operations with breezers, kept in bounded ring.
+
+    Operation is traced if its breezer is enabled explicitly or if it is sampled with sample_rate. Untraced operations
+    cost one random() call.
+    """
+
+    def __init__(self, size: int):
+        self._ring: collections.deque[Span] = collections.deque(maxlen=size)
+        self.sample_rate: float = 0.0
+        self.devices: set[str] = set()
+        # correlation ids are sequential per breezer
+        self._counters: dict[str, itertools.count] = {}
+
+    def is_traced(self, device: str) -> bool:
+        return device in self.devices or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    @contextlib.contextmanager
+    def span(self, device: str, operation: str, **attributes) -> Iterator[Span | _NoSpan]:
+        """Trace operation; events added within it (see `event`) go to its span"""
+        if not self.is_traced(device):
+            yield NO_SPAN
+            return
+
+        counter = self._counters.setdefault(device, itertools.count(1))
+        span = Span(f"{device}#{next(counter)}", device, operation, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.event("%s: %s", type(e).__name__, e)
+            span.finish(type(e).__name__)
+            raise
+        else:
+            span.finish("ok")
+        finally:
+            _current_span.reset(token)
+            self._ring.append(span)
+
+    def dump(self, devices: set[str] | None = None) -> list[dict]:
+        """Spans from the oldest one, of given breezers only if they are set"""
+        return [s.as_dict() for s in self._ring if devices is None or s.device in devices]
+
+    def clear(self, devices: set[str] | None = None) -> None:
+        """Remove spans, of given breezers only if they are set"""
+        if devices is None:
+            self._ring.clear()
+            return
+        kept = [s for s in self._ring if s.device not in devices]
+        self._ring.clear()
+        self._ring.extend(kept)
+
+    @property
+    def as_dict(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "devices": sorted(self.devices),
+            "spans": len(self._ring),
+            "size": self._ring.maxlen,
+        }
+
+
+@callback
+def async_get_tracer(hass: HomeAssistant) -> Tracer:
+    """Tracer shared by all breezers"""
+    data = hass.data.setdefault(DOMAIN, {})
+    if TRACER not in data:
+        data[TRACER] = Tracer(TRACE_RING_SIZE)
+    return data[TRACER]